@@ -19,6 +19,7 @@ from lib.db.base import ManagedBase
 from lib.db import (
 ListItem,
 GroupItem,
+OwnerItem,
 
 )
 
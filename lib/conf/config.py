@@ -6,12 +6,62 @@ class Settings(BaseSettings):
     session_path: str
     download_root_path: str
     github_token: str
+    github_tokens: str = ""
     telegram_bot_token: str
     admin_telegram_id: int
     telegram_api_id: str
     telegram_api_hash: str
     db_url: str
     yaml_file: str = "config/config.yaml"
+    http_pool_limit: int = 100
+    http_pool_limit_per_host: int = 10
+    http_dns_ttl: int = 300
+    http_keepalive_timeout: float = 60
+    breaker_failure_threshold: int = 5
+    breaker_open_seconds: int = 60
+    retry_max_attempts: int = 3
+    retry_budget_ratio: float = 0.2
+    retry_budget_max: int = 20
+    retry_backoff_base: float = 0.5
+    retry_backoff_cap: float = 30
+    poll_concurrency: int = 8
+    poll_timeout_seconds: int = 20
+    github_backend: str = "rest"
+    graphql_batch_size: int = 30
+    poll_default_interval_seconds: int = 3600
+    poll_min_interval_seconds: int = 600
+    poll_max_interval_seconds: int = 86400
+    poll_interval_ratio: float = 0.05
+    poll_jitter_ratio: float = 0.1
+    download_resume_max_age_seconds: int = 7 * 86400
+    download_max_segments: int = 8
+    download_min_segment_bytes: int = 2 * 1024 * 1024
+    download_steal_min_bytes: int = 1024 * 1024
+    state_path: str = "state/"
+    signed_url_default_ttl: int = 120
+    signed_url_margin_seconds: int = 30
+    download_rate_limit: str = ""
+    download_rate_schedule: str = ""
+    download_mirrors: str = ""
+    mirror_probe_bytes: int = 64 * 1024
+    mirror_race_timeout: int = 10
+    mirror_quarantine_seconds: int = 3600
+    download_max_repos: int = 3
+    download_max_files: int = 6
+    download_max_connections: int = 16
+    download_max_connections_per_host: int = 8
+    store_path: str = ""
+    blob_store_enabled: bool = True
+    blob_gc_grace_seconds: int = 3600
+    release_versions_keep: int = 3
+    staging_path: str = ""
+    prefetch_max_bytes: int = 2 * 1024 ** 3
+    webhook_enabled: bool = False
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_path: str = "/webhook/github"
+    webhook_secret: str = ""
+    webhook_max_body_bytes: int = 25 * 1024 * 1024
     model_config = ConfigDict(env_file="config/.env")
 
 settings = Settings()
@@ -18,5 +18,8 @@ def load_yaml_config() -> dict:
         logger.error(f'yaml语法错误：{e}')
         return None
     
-def yaml_config_fillter(fillter) -> dict:
-    return load_yaml_config()[fillter]
\ No newline at end of file
+def yaml_config_fillter(fillter, default=None) -> dict:
+    config = load_yaml_config() or {}
+    if default is not None:
+        return config.get(fillter) or default
+    return config[fillter]
\ No newline at end of file
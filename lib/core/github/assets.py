@@ -0,0 +1,99 @@
+import os
+import json
+import shutil
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import MANIFEST_SUFFIX
+from lib.utils.blobs import sha256_file
+from lib.core.github.release import link_filename, safe_tag
+
+
+def _manifest_path(repo: str) -> str:
+    return os.path.join(settings.state_path, "assets", safe_tag(repo) + ".json")
+
+
+def load_asset_manifest(repo: str) -> Dict[str, dict]:
+    """当前已发布目录里每个文件的来源元数据：文件名 -> {size, digest, updated_at}。"""
+    try:
+        with open(_manifest_path(repo), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"[{repo}] 读取资产清单失败，本次全部重新下载：{e}")
+        return {}
+
+
+def save_asset_manifest(repo: str, links: List[Dict[str, Any]]) -> None:
+    path = _manifest_path(repo)
+    entries = {
+        link_filename(link["url"]): {k: link.get(k) for k in ("size", "digest", "updated_at")}
+        for link in links
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.warning(f"[{repo}] 保存资产清单失败：{e}")
+
+
+async def _unchanged(prev: Optional[dict], link: Dict[str, Any], published: str) -> bool:
+    """同名文件内容未变：摘要相同，或没有摘要时大小与上传时间都相同。"""
+    try:
+        size = os.path.getsize(published)
+    except OSError:
+        return False
+    if link.get("size") is not None and size != link["size"]:
+        return False
+    digest = link.get("digest")
+    if prev is None:
+        # 还没有清单（升级后第一次）：有上游摘要时直接校验已发布的文件
+        if not digest or not digest.startswith("sha256:"):
+            return False
+        return await asyncio.to_thread(sha256_file, published) == digest.split(":", 1)[1].lower()
+    if digest and prev.get("digest"):
+        return digest == prev["digest"]
+    return (
+        link.get("updated_at") is not None
+        and prev.get("updated_at") == link["updated_at"]
+        and prev.get("size") == link.get("size")
+    )
+
+
+async def reuse_unchanged(repo: str, repo_dir: str, tmp_dir: str, links: List[Dict[str, Any]]) -> Set[str]:
+    """
+    把与当前已发布版本相同的文件硬链接进 tmp_dir（跨文件系统时复制），返回这些文件名；
+    只有新增或变化的资产需要下载。
+    """
+    manifest = load_asset_manifest(repo)
+    reused: Set[str] = set()
+    saved = 0
+    for link in links:
+        name = link_filename(link["url"])
+        published = os.path.join(repo_dir, name)
+        if not await _unchanged(manifest.get(name), link, published):
+            continue
+        target = os.path.join(tmp_dir, name)
+        for stale in (target, target + MANIFEST_SUFFIX):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        try:
+            os.link(published, target)
+        except OSError:
+            try:
+                shutil.copy2(published, target)
+            except OSError as e:
+                logger.warning(f"[{repo}] 复用 {name} 失败，改为重新下载：{e}")
+                continue
+        reused.add(name)
+        saved += os.path.getsize(target)
+    if reused:
+        logger.info(f"[{repo}] {len(reused)}/{len(links)} 个文件未变化，直接复用（省去 {saved} 字节下载）")
+    return reused
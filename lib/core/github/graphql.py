@@ -0,0 +1,148 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import get_http_session, call_with_retry, CircuitOpenError
+from lib.core.github.release import normalize_graphql_asset, build_release_info
+from lib.core.github.tokens import request_with_pool
+
+__graphql_api = "https://api.github.com/graphql"
+
+_ASSET_PAGE_SIZE = 100
+_ASSET_FIELDS = "name downloadUrl size digest updatedAt contentType"
+_ASSETS_BLOCK = (
+    "releaseAssets(first: %d, after: %s) { pageInfo { hasNextPage endCursor } nodes { %s } }"
+)
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def _split_repo(repo: str) -> tuple[str, str]:
+    owner, _, name = repo.strip("/").partition("/")
+    return owner, name
+
+
+def _build_batch_query(repos: List[str]) -> tuple[str, dict]:
+    """每个仓库一个别名 r0..rN，owner/name 通过变量传入，避免拼接注入。"""
+    var_defs, fields, variables = [], [], {}
+    assets = _ASSETS_BLOCK % (_ASSET_PAGE_SIZE, "null", _ASSET_FIELDS)
+    for i, repo in enumerate(repos):
+        owner, name = _split_repo(repo)
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+        var_defs.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(
+            f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ latestRelease {{ tagName publishedAt {assets} }} }}"
+        )
+    query = f"query({', '.join(var_defs)}) {{ {' '.join(fields)} }}"
+    return query, variables
+
+
+def _build_page_query() -> str:
+    assets = _ASSETS_BLOCK % (_ASSET_PAGE_SIZE, "$after", _ASSET_FIELDS)
+    return (
+        "query($o: String!, $n: String!, $after: String) { "
+        f"repository(owner: $o, name: $n) {{ latestRelease {{ tagName {assets} }} }} }}"
+    )
+
+
+async def _post_graphql(query: str, variables: dict) -> dict:
+    timeout = aiohttp.ClientTimeout(total=settings.poll_timeout_seconds)
+
+    async def _request() -> dict:
+        async with request_with_pool(
+            get_http_session(),
+            "POST",
+            __graphql_api,
+            resource="graphql",
+            json={"query": query, "variables": variables},
+            timeout=timeout,
+        ) as resp:
+            if resp is None:
+                raise GraphQLError("所有 token 均被限流")
+            resp.raise_for_status()
+            return await resp.json(content_type=None)
+
+    payload = await call_with_retry(__graphql_api, _request)
+
+    data = payload.get("data")
+    if data is None:
+        raise GraphQLError(str(payload.get("errors")))
+    # 仓库不存在等局部错误只影响对应别名，整体结果仍可用
+    for err in payload.get("errors") or []:
+        logger.warning(f"GraphQL 局部错误：{err.get('path')} {err.get('message')}")
+    return data
+
+
+async def _fetch_remaining_assets(repo: str, tag: str, cursor: str) -> List[dict]:
+    owner, name = _split_repo(repo)
+    query = _build_page_query()
+    nodes: List[dict] = []
+    while cursor:
+        data = await _post_graphql(query, {"o": owner, "n": name, "after": cursor})
+        release = ((data.get("repository") or {}).get("latestRelease")) or {}
+        if release.get("tagName") != tag:
+            raise GraphQLError(f"{repo} 分页期间 latest release 发生变化")
+        page = release.get("releaseAssets") or {}
+        nodes.extend(page.get("nodes") or [])
+        info = page.get("pageInfo") or {}
+        cursor = info.get("endCursor") if info.get("hasNextPage") else None
+    return nodes
+
+
+async def _parse_repo(repo: str, node: Optional[dict]) -> Dict[str, Any]:
+    if node is None:
+        return {"error": "not_found"}
+    release = node.get("latestRelease")
+    if not release:
+        return {"error": "no_release"}
+
+    tag = release.get("tagName")
+    page = release.get("releaseAssets") or {}
+    nodes = list(page.get("nodes") or [])
+    info = page.get("pageInfo") or {}
+    if info.get("hasNextPage"):
+        nodes.extend(await _fetch_remaining_assets(repo, tag, info.get("endCursor")))
+    return build_release_info(
+        tag,
+        [normalize_graphql_asset(n) for n in nodes],
+        published_at=release.get("publishedAt"),
+    )
+
+
+async def get_remote_infos_graphql(repos: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    一次别名查询获取一批仓库的 latest release 与资产元数据。
+    返回 {repo: info}，info 结构与 get_remote_info 一致。
+    """
+    if not repos:
+        return {}
+
+    try:
+        query, variables = _build_batch_query(repos)
+        data = await _post_graphql(query, variables)
+    except CircuitOpenError:
+        return {repo: {"error": "circuit_open"} for repo in repos}
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"GitHub GraphQL 请求失败（{len(repos)} 个仓库）: {e.status} {e.message}")
+        return {repo: {"error": f"http_{e.status}"} for repo in repos}
+    except asyncio.TimeoutError:
+        logger.error(f"GitHub GraphQL 请求超时（{len(repos)} 个仓库）")
+        return {repo: {"error": "timeout"} for repo in repos}
+    except Exception as e:
+        logger.error(f"GitHub GraphQL 请求失败（{len(repos)} 个仓库）：{e}")
+        return {repo: {"error": type(e).__name__} for repo in repos}
+
+    infos: Dict[str, Dict[str, Any]] = {}
+    for i, repo in enumerate(repos):
+        try:
+            infos[repo] = await _parse_repo(repo, data.get(f"r{i}"))
+        except Exception as e:
+            logger.error(f"解析 {repo} 的 GraphQL 结果失败：{e}")
+            infos[repo] = {"error": type(e).__name__}
+    return infos
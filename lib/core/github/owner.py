@@ -0,0 +1,169 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import get_http_session, call_with_retry
+from lib.db import (
+    ListItem,
+    OwnerItem,
+    run_db_session,
+    get_all_owner_items,
+    get_list_item_by_repository,
+    get_list_items_by_owner,
+    create_list_item,
+    update_list_item,
+    update_owner_item,
+    delete_list_item,
+)
+from lib.core.github.tokens import request_with_pool
+from lib.core.github.versions import rename_versions
+from lib.schedule.cadence import poll_queue
+from lib.schedule.downloads import current_job, cancel_download
+
+__github_users_api = "https://api.github.com/users/"
+_PAGE_SIZE = 100
+
+
+async def _fetch_page(owner: str, page: int, etag: Optional[str]) -> Tuple[int, Optional[str], List[dict]]:
+    """返回 (status, etag, repos)。304 时 repos 为空，调用方沿用缓存。"""
+    url = f"{__github_users_api}{owner}/repos"
+    params = {"per_page": _PAGE_SIZE, "page": page, "sort": "full_name", "type": "owner"}
+    timeout = aiohttp.ClientTimeout(total=settings.poll_timeout_seconds)
+
+    async def _request() -> Optional[Tuple[int, Optional[str], List[dict]]]:
+        headers = {"If-None-Match": etag} if etag else {}
+        async with request_with_pool(get_http_session(), "GET", url, params=params, headers=headers, timeout=timeout) as resp:
+            if resp is None:
+                return None
+            if resp.status == 304:
+                return 304, etag, []
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+            repos = [
+                {"name": r["name"], "archived": bool(r.get("archived")), "fork": bool(r.get("fork"))}
+                for r in data
+            ]
+            return resp.status, resp.headers.get("ETag"), repos
+
+    result = await call_with_retry(url, _request)
+    if result is not None:
+        return result
+    raise RuntimeError("所有 token 均被限流")
+
+
+async def list_owner_repos(owner: str, cached: Optional[List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    按页条件请求仓库列表，每页缓存 ETag 与结果。返回 (pages, changed)。
+    各页都命中 304 时 changed 为 False，且这些请求不计入速率限制。
+    """
+    cached = list(cached or [])
+    pages: List[Dict[str, Any]] = []
+    changed = False
+    page = 1
+    while True:
+        old = cached[page - 1] if page <= len(cached) else None
+        status, etag, repos = await _fetch_page(owner, page, old.get("etag") if old else None)
+        if status == 304 and old is not None:
+            entry = old
+        else:
+            entry = {"etag": etag, "repos": repos}
+            changed = True
+        pages.append(entry)
+        if len(entry["repos"]) < _PAGE_SIZE:
+            break
+        page += 1
+    if len(pages) != len(cached):
+        changed = True
+    return pages, changed
+
+
+def _select_repos(owner_item: OwnerItem, pages: List[Dict[str, Any]]) -> List[str]:
+    pattern = re.compile(owner_item.pattern) if owner_item.pattern else None
+    names = []
+    for entry in pages:
+        for repo in entry["repos"]:
+            if repo["archived"]:
+                continue
+            if repo["fork"] and not owner_item.include_forks:
+                continue
+            if pattern and not pattern.search(repo["name"]):
+                continue
+            names.append(repo["name"])
+    return names
+
+
+async def sync_owner(owner_item: OwnerItem) -> None:
+    owner = owner_item.owner
+    pages, changed = await list_owner_repos(owner, owner_item.pages)
+    if not changed:
+        return
+
+    wanted = {f"{owner}/{name}": name for name in _select_repos(owner_item, pages)}
+    existing = {item.repository: item for item in await run_db_session(get_list_items_by_owner, owner)}
+
+    added = removed = 0
+    for repo, name in wanted.items():
+        path = f"{owner_item.folder.strip('/')}/{name}"
+        if repo in existing:
+            item = existing[repo]
+            if item.enabled != owner_item.enabled:
+                await run_db_session(update_list_item, repo, enabled=owner_item.enabled)
+            if item.path != path:
+                old_dir = os.path.join(settings.download_root_path, item.path)
+                if os.path.islink(old_dir):
+                    rename_versions(item.path, path)
+                elif os.path.exists(old_dir):
+                    os.makedirs(os.path.dirname(os.path.join(settings.download_root_path, path)), exist_ok=True)
+                    os.rename(old_dir, os.path.join(settings.download_root_path, path))
+                await run_db_session(update_list_item, repo, path=path)
+            continue
+        # 已在 repositories 中单独配置的仓库以显式配置为准
+        if await run_db_session(get_list_item_by_repository, repo):
+            continue
+        await run_db_session(create_list_item, ListItem(
+            name=name,
+            repository=repo,
+            path=path,
+            enabled=owner_item.enabled,
+            owner=owner,
+        ))
+        if owner_item.enabled:
+            poll_queue.schedule_in(repo, 0)
+        added += 1
+
+    deferred = False
+    for repo in existing.keys() - wanted.keys():
+        job = current_job(repo)
+        if job is not None and job.publishing:
+            # 正在发布无法取消：这次不保存仓库列表，下次同步时再移除
+            logger.info(f"[{repo}] 已不在 {owner} 的仓库列表中，但正在发布新版本，稍后再移除")
+            deferred = True
+            continue
+        # 先取消进行中的下载，避免删除配置后下载任务还在更新它的状态
+        await cancel_download(repo, f"已不在 {owner} 的仓库列表中")
+        await run_db_session(delete_list_item, repo)
+        poll_queue.discard(repo)
+        removed += 1
+        logger.info(
+            f"[{repo}] 已不在 {owner} 的仓库列表中，移除配置；已下载的文件保留在 "
+            f"{os.path.join(settings.download_root_path, existing[repo].path)}，不需要时请手动删除"
+        )
+
+    if not deferred:
+        await run_db_session(update_owner_item, owner, pages=pages)
+    logger.info(f"用户/组织 {owner} 仓库发现：新增 {added} 个，移除 {removed} 个，当前 {len(wanted)} 个")
+
+
+async def sync_all_owners() -> None:
+    owners = await run_db_session(get_all_owner_items)
+    for owner_item in owners:
+        if not owner_item.enabled:
+            continue
+        try:
+            await sync_owner(owner_item)
+        except Exception as e:
+            logger.error(f"同步用户/组织 {owner_item.owner} 的仓库列表失败：{e}")
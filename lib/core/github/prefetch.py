@@ -0,0 +1,258 @@
+import os
+import time
+import shutil
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import get_http_session, download_file_async, drop_manifests, call_with_retry, throttle_for, store_dir, move_legacy_dir
+from lib.utils.blobs import sha256_hex, sha256_file
+from lib.utils.download_queue import file_slots
+from lib.core.github.release import normalize_rest_asset, build_release_info, apply_asset_rules, link_filename, link_meta, safe_tag
+from lib.core.github.tokens import request_with_pool
+
+__github_api = "https://api.github.com/repos/"
+__github_api_postfix = "/releases?per_page=10"
+
+_PART_SUFFIX = ".part"
+
+# repo -> 正在进行的预取任务
+_prefetch_tasks: Dict[str, asyncio.Task] = {}
+# repo -> (ETag, 最新预发布信息)，releases 列表用条件请求，未变化时不计入速率限制
+_list_cache: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+
+
+def prefetch_enabled(item) -> bool:
+    return bool((item.options or {}).get("prerelease"))
+
+
+def staging_root() -> str:
+    return settings.staging_path or store_dir("staging")
+
+
+def migrate_legacy_staging() -> None:
+    """把 download_root_path/.gda-staging 移到 staging_root()。"""
+    move_legacy_dir(os.path.join(settings.download_root_path, ".gda-staging"), staging_root())
+
+
+def staging_dir(item, tag: str) -> str:
+    return os.path.join(staging_root(), item.path, safe_tag(tag))
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for base, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(base, name))
+            except OSError:
+                pass
+    return total
+
+
+def _staged_dirs() -> List[str]:
+    """所有已完成的预取目录（staging_root/<path...>/<tag>，不含 .part）。"""
+    root = staging_root()
+    found = []
+    for base, dirs, files in os.walk(root):
+        if files and not base.endswith(_PART_SUFFIX):
+            found.append(base)
+    return found
+
+
+def _reserve_budget(need: int, keep: str) -> bool:
+    """确保预取总占用不超过 prefetch_max_bytes，不够时按最旧优先淘汰已完成的预取。"""
+    budget = settings.prefetch_max_bytes
+    if need > budget:
+        return False
+    used = _dir_size(staging_root()) if os.path.exists(staging_root()) else 0
+    if used + need <= budget:
+        return True
+    for path in sorted(_staged_dirs(), key=os.path.getmtime):
+        if path == keep:
+            continue
+        size = _dir_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"预取空间不足，淘汰 {path}（{size} 字节）")
+        used -= size
+        if used + need <= budget:
+            return True
+    return used + need <= budget
+
+
+async def get_newest_prerelease(repo: str) -> Optional[Dict[str, Any]]:
+    url = f"{__github_api}{repo}{__github_api_postfix}"
+    cached = _list_cache.get(repo)
+    timeout = aiohttp.ClientTimeout(total=settings.poll_timeout_seconds)
+
+    async def _request() -> Optional[tuple]:
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        async with request_with_pool(get_http_session(), "GET", url, headers=headers, timeout=timeout) as resp:
+            if resp is None:
+                return None
+            if resp.status == 304 and cached:
+                return 304, None, None
+            resp.raise_for_status()
+            return resp.status, await resp.json(content_type=None), resp.headers.get("ETag")
+
+    result = await call_with_retry(url, _request)
+    if result is None:
+        return None
+    status, releases, etag = result
+    if status == 304:
+        return cached[1]
+
+    newest = None
+    for release in releases:
+        if release.get("draft") or not release.get("prerelease"):
+            continue
+        newest = build_release_info(
+            release.get("tag_name"),
+            [normalize_rest_asset(asset) for asset in release.get("assets", [])],
+            published_at=release.get("published_at"),
+        )
+        break
+    if etag:
+        _list_cache[repo] = (etag, newest)
+    return newest
+
+
+def _drop_other_stages(item, keep_tag: str) -> None:
+    repo_stage = os.path.join(staging_root(), item.path)
+    if not os.path.isdir(repo_stage):
+        return
+    keep = {safe_tag(keep_tag), safe_tag(keep_tag) + _PART_SUFFIX}
+    for name in os.listdir(repo_stage):
+        if name not in keep:
+            shutil.rmtree(os.path.join(repo_stage, name), ignore_errors=True)
+
+
+async def _stage(item, info: Dict[str, Any]) -> None:
+    tag = info["version"]
+    target = staging_dir(item, tag)
+    part = target + _PART_SUFFIX
+    need = sum(asset.get("size") or 0 for asset in info["assets"])
+    if not _reserve_budget(need, keep=target):
+        logger.info(f"[{item.repository}] 预发布 {tag} 需要 {need} 字节，超出预取空间上限，跳过")
+        return
+
+    shutil.rmtree(part, ignore_errors=True)
+    os.makedirs(part, exist_ok=True)
+    throttle = throttle_for(item.repository, item.options)
+
+    async def _one(link: dict) -> None:
+        # 与正式下载共用全进程的文件槽位，排在所有正式下载之后
+        async with file_slots.acquire(float("inf")):
+            await download_file_async(
+                link["url"], link_filename(link["url"]), part, num_threads=5,
+                size=link.get("size"), validator=link.get("digest") or link.get("updated_at"),
+                digest=link.get("digest"), throttle=throttle,
+            )
+
+    logger.info(f"[{item.repository}] 开始预取预发布 {tag}（{len(info['links'])} 个文件）")
+    try:
+        await asyncio.gather(*(_one(link) for link in info["links"]))
+    except Exception as e:
+        logger.warning(f"[{item.repository}] 预取 {tag} 失败：{e}")
+        shutil.rmtree(part, ignore_errors=True)
+        return
+
+    drop_manifests(part)
+    # 同一仓库只保留最新一个预发布
+    _drop_other_stages(item, tag)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.rename(part, target)
+    logger.info(f"[{item.repository}] 预发布 {tag} 已预取完成，转正后可直接发布")
+
+
+async def check_prerelease(item) -> None:
+    """对开启 prerelease 的仓库，后台预取最新预发布的文件到 staging 区。"""
+    if not prefetch_enabled(item):
+        return
+    repo = item.repository
+    task = _prefetch_tasks.get(repo)
+    if task and not task.done():
+        return
+
+    try:
+        info = await get_newest_prerelease(repo)
+    except Exception as e:
+        logger.warning(f"获取 {repo} 预发布信息失败：{e}")
+        return
+    if info:
+        info = apply_asset_rules(info, item.options)
+    if not info or not info["version"] or not info["links"]:
+        return
+    if info["version"] in (item.version, item.new_version):
+        return
+    if os.path.isdir(staging_dir(item, info["version"])):
+        return
+
+    _prefetch_tasks[repo] = asyncio.create_task(_stage(item, info))
+
+
+async def _matches_release(path: str, link: Dict[str, Any]) -> bool:
+    """预取的文件与正式版 release 的资产一致：大小相同，有上游摘要时摘要也相同。"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if link.get("size") is not None and size != link["size"]:
+        return False
+    sha = sha256_hex(link.get("digest"))
+    return sha is None or await asyncio.to_thread(sha256_file, path) == sha
+
+
+async def take_staged(item, tag: str, links: List[dict]) -> Optional[Tuple[str, Set[str]]]:
+    """
+    若该 tag 已预取，逐个按正式版的大小与摘要校验预取的文件（转正前可能被同名重新上传），
+    删除不一致的文件后返回 (staging 目录, 可直接使用的文件名)，其余文件由调用方重新下载；
+    一个都不能用时清理预取并返回 None。正在预取同一 tag 时先等它完成，预取的是其他 tag 时取消。
+    """
+    path = staging_dir(item, tag)
+    task = _prefetch_tasks.get(item.repository)
+    if task and not task.done():
+        if os.path.isdir(path + _PART_SUFFIX):
+            # 正在预取的就是这个 tag：等它完成，避免同一批文件再下载一遍
+            logger.info(f"[{item.repository}] 等待正在进行的 {tag} 预取完成")
+        else:
+            task.cancel()
+        await asyncio.wait([task])
+    if not os.path.isdir(path):
+        return None
+    valid: Set[str] = set()
+    for link in map(link_meta, links):
+        name = link_filename(link["url"])
+        staged = os.path.join(path, name)
+        if await _matches_release(staged, link):
+            valid.add(name)
+        elif os.path.exists(staged):
+            logger.info(f"[{item.repository}] 预取的 {name} 与正式版不一致，重新下载")
+            os.remove(staged)
+    if not valid:
+        logger.info(f"[{item.repository}] 预取的 {tag} 与正式版文件不一致，丢弃预取")
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+    return path, valid
+
+
+def cleanup_staging(grace_seconds: int) -> int:
+    """清理异常退出遗留的 .part 预取目录，返回清理数量。"""
+    root = staging_root()
+    if not os.path.exists(root) or any(not t.done() for t in _prefetch_tasks.values()):
+        return 0
+    now = time.time()
+    removed = 0
+    for base, dirs, _ in os.walk(root):
+        for name in list(dirs):
+            if not name.endswith(_PART_SUFFIX):
+                continue
+            path = os.path.join(base, name)
+            if now - os.path.getmtime(path) > grace_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                dirs.remove(name)
+                removed += 1
+    return removed
@@ -0,0 +1,143 @@
+import re
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+
+from lib.log import logger
+from lib.utils import get_download_field
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def link_filename(url: str) -> str:
+    """下载链接对应的本地文件名（去掉查询参数并解码）。"""
+    return unquote(urlsplit(url).path.rstrip("/").split("/")[-1]) or "index"
+
+
+def link_meta(link) -> Dict[str, Any]:
+    """ListItem.links 中的一项 -> 资产元数据；兼容旧数据中只存了 URL 字符串的情况。"""
+    if isinstance(link, str):
+        return {"name": link_filename(link), "url": link, "size": None, "digest": None, "content_type": None, "updated_at": None}
+    return link
+
+
+def safe_tag(tag: str) -> str:
+    """版本号用作目录名时替换掉不安全的字符。"""
+    return re.sub(r"[^\w.\-+]", "_", tag)
+
+
+def normalize_rest_asset(asset: dict) -> Optional[Dict[str, Any]]:
+    """REST / webhook 中的 release asset -> 统一的资产元数据。"""
+    url = asset.get(get_download_field("github"))
+    if not url:
+        return None
+    return {
+        "name": asset.get("name") or link_filename(url),
+        "url": url,
+        "size": asset.get("size"),
+        "digest": asset.get("digest"),
+        "content_type": asset.get("content_type"),
+        "updated_at": asset.get("updated_at"),
+    }
+
+
+def normalize_graphql_asset(node: dict) -> Optional[Dict[str, Any]]:
+    """GraphQL ReleaseAsset 节点 -> 统一的资产元数据。"""
+    url = node.get("downloadUrl")
+    if not url:
+        return None
+    return {
+        "name": node.get("name") or link_filename(url),
+        "url": url,
+        "size": node.get("size"),
+        "digest": node.get("digest"),
+        "content_type": node.get("contentType"),
+        "updated_at": node.get("updatedAt"),
+    }
+
+
+def normalize_http_asset(meta: dict) -> Optional[Dict[str, Any]]:
+    """通用 HTTP 源 HEAD 得到的元数据 -> 统一的资产元数据。"""
+    url = meta.get(get_download_field("http"))
+    if not url:
+        return None
+    return {
+        "name": link_filename(url),
+        "url": url,
+        "size": meta.get("size"),
+        "digest": None,
+        "content_type": meta.get("content_type"),
+        "updated_at": meta.get("updated_at"),
+    }
+
+
+def build_release_info(
+    version: Optional[str],
+    assets: List[Optional[dict]],
+    published_at: Optional[str] = None,
+) -> Dict[str, Any]:
+    """REST 与 GraphQL 两种后端共用的检查结果结构。"""
+    assets = [a for a in assets if a]
+    return {
+        "version": version,
+        "published_at": published_at,
+        "assets": assets,
+        # 下载链接连同大小等元数据一起保存，下载时无需再探测
+        "links": assets,
+    }
+
+
+def _matchers(value) -> List[Callable[[str], bool]]:
+    """"re:" 开头按正则搜索，其余按 glob 匹配文件名（不区分大小写）；无法解析的正则忽略。"""
+    if not value:
+        return []
+    matchers = []
+    for pattern in [value] if isinstance(value, str) else value:
+        pattern = str(pattern)
+        if pattern.startswith("re:"):
+            try:
+                matchers.append(re.compile(pattern[3:]).search)
+            except re.error:
+                logger.warning(f"无法解析资产过滤正则 {pattern!r}，已忽略")
+        else:
+            matchers.append(lambda name, p=pattern.lower(): fnmatch(name.lower(), p))
+    return matchers
+
+
+def _parse_size(value) -> Optional[int]:
+    """"200M" / "1.5G" / 1048576 -> 字节数；无法解析时不限制。"""
+    if value is None or value == "":
+        return None
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?", str(value).strip().upper())
+    if not m:
+        logger.warning(f"无法解析 max_size {value!r}，不限制大小")
+        return None
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2)])
+
+
+def filter_assets(assets: List[Any], options: Optional[dict]) -> List[Dict[str, Any]]:
+    """
+    按仓库 config 中的 include / exclude（glob 或 "re:" 正则，可写成列表）与 max_size 过滤资产，
+    被跳过的资产不会写入下载链接，也就不会被下载、保存或计入完整性检查。
+    """
+    options = options or {}
+    include, exclude = _matchers(options.get("include")), _matchers(options.get("exclude"))
+    max_size = _parse_size(options.get("max_size"))
+    kept = []
+    for asset in map(link_meta, assets):
+        name = asset.get("name") or link_filename(asset["url"])
+        if include and not any(match(name) for match in include):
+            continue
+        if any(match(name) for match in exclude):
+            continue
+        # 大小未知的资产无法判断，保留
+        if max_size is not None and (asset.get("size") or 0) > max_size:
+            continue
+        kept.append(asset)
+    return kept
+
+
+def apply_asset_rules(info: Dict[str, Any], options: Optional[dict]) -> Dict[str, Any]:
+    """对 build_release_info 的结果应用资产过滤，返回新的结果。"""
+    kept = filter_assets(info.get("assets") or [], options)
+    return dict(info, assets=kept, links=kept)
@@ -3,21 +3,32 @@ import os
 import time
 import shutil
 import asyncio
-from uuid import uuid4
-from typing import Dict, List
+from collections import Counter
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional
 
 import aiohttp
 
 from lib.log import logger
 from lib.conf import settings
 from lib.utils import (
-    get_header,
-    get_download_field,
+    get_http_session,
+    format_http_stats,
+    format_resilience_stats,
     check_path_exists,
     count_files,
     get_bj_now,
     download_file_async,
+    MANIFEST_SUFFIX,
+    drop_manifests,
+    call_with_retry,
+    CircuitOpenError,
+    DigestMismatchError,
+    throttle_for,
+    fetch_once,
+    ingest,
 )
+from lib.utils.download_queue import repo_slots, file_slots, size_priority
 from lib.db import (
     run_db_session,
     get_all_list_items,
@@ -26,15 +37,27 @@ from lib.db import (
     promote_status,  
     get_all_group_items
 )
+from lib.core.github.release import normalize_rest_asset, build_release_info, filter_assets, link_filename, link_meta, safe_tag
+from lib.core.github.graphql import get_remote_infos_graphql
+from lib.core.http.remote import get_url_info
+from lib.core.github.tokens import request_with_pool
+from lib.core.github.prefetch import check_prerelease, take_staged
+from lib.core.github.assets import reuse_unchanged, save_asset_manifest
+from lib.core.github.versions import publish_version, schedule_prune
 from lib.telegram.core import send_message  
 from lib.schedule.locks import repo_lock  
+from lib.schedule.downloads import run_download, current_job, queue_download
+from lib.schedule.cadence import poll_queue, compute_poll_interval, append_release_history
 
 __github_api = "https://api.github.com/repos/"
 __github_api_postfix = "/releases/latest"
 
 
 async def _safe_clear_dir(path: str) -> None:
-    if os.path.exists(path):
+    if os.path.islink(path):
+        # 之前按版本目录发布过：只去掉链接，不动版本目录
+        os.remove(path)
+    elif os.path.exists(path):
         shutil.rmtree(path, ignore_errors=True)
     os.makedirs(path, exist_ok=True)
 
@@ -46,54 +69,98 @@ async def _move_all(src: str, dst: str) -> None:
         shutil.move(s, d)
 
 
-async def get_remote_info(repo: str) -> Dict[str, List[str]]:
-    infos: Dict[str, List[str] | str] = {}
+async def get_remote_info(
+    repo: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    获取仓库最新 release。传入上次保存的 ETag / Last-Modified 时发送条件请求，
+    命中 304 时返回 {"not_modified": True}（GitHub 不计入速率限制）。
+    """
+    infos: Dict[str, Any] = {}
     url = f"{__github_api}{repo}{__github_api_postfix}"
+    timeout = aiohttp.ClientTimeout(total=settings.poll_timeout_seconds)
+
+    async def _request() -> Optional[tuple]:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with request_with_pool(get_http_session(), "GET", url, headers=headers, timeout=timeout) as resp:
+            if resp is None:
+                return None
+            if resp.status == 304:
+                return 304, None, None, None
+            resp.raise_for_status()
+            response = await resp.json(content_type=None)
+            return resp.status, response, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
 
     try:
-        github_http_header = get_header(settings.github_token)
-        timeout = aiohttp.ClientTimeout(total=20)
-
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url, headers=github_http_header) as resp:
-                resp.raise_for_status()
-                response = await resp.json(content_type=None)
-
-        ver = response.get("tag_name")
-        download_field = get_download_field("github")
-        links = [asset[download_field] for asset in response.get("assets", []) if download_field in asset]
-
-        infos = {
-            "version": ver,
-            "links": links,
-        }
-
+        result = await call_with_retry(url, _request)
+        if result is None:
+            return {"error": "rate_limited"}
+        status, response, new_etag, new_last_modified = result
+        if status == 304:
+            return {"not_modified": True}
+
+        infos = build_release_info(
+            response.get("tag_name"),
+            [normalize_rest_asset(asset) for asset in response.get("assets", [])],
+            published_at=response.get("published_at"),
+        )
+        infos["etag"] = new_etag
+        infos["last_modified"] = new_last_modified
+
+    except CircuitOpenError:
+        infos = {"error": "circuit_open"}
     except aiohttp.ClientResponseError as e:
         logger.error(f"GitHub API 请求失败 ({repo}): {e.status} {e.message}")
+        infos = {"error": f"http_{e.status}"}
+    except asyncio.TimeoutError:
+        logger.error(f"获取 {repo} 仓库最新版本信息超时")
+        infos = {"error": "timeout"}
+    except aiohttp.ClientError as e:
+        logger.error(f"获取 {repo} 仓库最新版本信息失败：{e}")
+        infos = {"error": "network"}
     except Exception as e:
         logger.error(f"获取 {repo} 仓库最新版本信息失败：{e}")
+        infos = {"error": type(e).__name__}
 
     return infos 
 
 
-async def fetch_github_remote_info() -> None:
-    items = await run_db_session(get_all_list_items)
-    for item in items:
-        if not item.enabled or item.status != "FREE":
-            continue
+def _link_names(links: list) -> set:
+    return {link_filename(link_meta(link)["url"]) for link in links}
 
-        repo = item.repository
-        info = await get_remote_info(repo)
-        if not info:
-            continue
 
+async def _apply_remote_info(item, info: Dict[str, Any]) -> str:
+    """根据检查结果更新数据库并安排下次检查，返回结果类型供本轮汇总统计。"""
+    history = item.release_history
+    try:
+        if info.get("error"):
+            return info["error"]
+        if info.get("not_modified"):
+            await check_prerelease(item)
+            return "not_modified"
+
+        repo = item.repository
         new_version = info.get("version")
-        links = info.get("links", [])
+        # 仓库的 include / exclude / max_size 规则在这里生效，跳过的资产不会进入下载链接
+        all_links = info.get("links", [])
+        links = filter_assets(all_links, item.options)
         if not new_version:
-            continue
+            return "no_version"
 
+        # GraphQL 后端没有 ETag，只在结果里带了校验值时才更新
+        validators = {k: info[k] for k in ("etag", "last_modified") if k in info}
         if item.version != new_version:
             logger.info(f"检测到 {item.name} 有新版本：{item.version} -> {new_version}")
+            if len(links) != len(all_links):
+                logger.info(f"{item.name} 按过滤规则保留 {len(links)}/{len(all_links)} 个资产")
+            history = append_release_history(history, info.get("published_at"))
             await run_db_session(
                 update_list_item,
                 repo,
@@ -101,61 +168,244 @@ async def fetch_github_remote_info() -> None:
                 links=links,
                 status="PENDING",
                 start_at=get_bj_now(),
+                release_history=history,
+                **validators,
             )
+            submit_download(repo)
+            return "updated"
+        if _link_names(links) != _link_names(item.links or []):
+            # 同一版本下要下载的资产变了（过滤规则修改、上游增删文件）：重新同步，未变的文件直接复用
+            logger.info(f"{item.name} 的资产列表有变化，重新同步 {new_version}（{len(links)} 个资产）")
+            await run_db_session(
+                update_list_item,
+                repo,
+                new_version=new_version,
+                links=links,
+                status="PENDING",
+                start_at=get_bj_now(),
+                **validators,
+            )
+            submit_download(repo)
+            return "updated"
+        if any(getattr(item, k) != v for k, v in validators.items()):
+            await run_db_session(update_list_item, repo, **validators)
+        await check_prerelease(item)
+        return "unchanged"
+    finally:
+        poll_queue.schedule_in(item.repository, compute_poll_interval(history))
+
+
+async def apply_release_payload(repo: str, release: Dict[str, Any]) -> str:
+    """
+    webhook 推送的 release 先用 /releases/latest 确认确实是仓库当前的最新版本
+    （给旧版本补发的 release、make_latest=false 的 release 同样会推送），再走与轮询相同的版本比较 / PENDING 流程。
+    仓库正在下载等非 FREE 状态或确认失败时不处理，交由轮询兜底并尽快安排一次检查。
+    """
+    item = await run_db_session(refresh_item, repo)
+    if not item or not item.enabled:
+        return "ignored"
+    if item.status != "FREE":
+        poll_queue.schedule_in(repo, settings.poll_min_interval_seconds)
+        return "busy"
+
+    info = await get_remote_info(repo)
+    if info.get("error"):
+        poll_queue.schedule_in(repo, 0)
+        return "deferred"
+    if info.get("version") != release.get("tag_name"):
+        logger.info(f"[{repo}] webhook 推送的 {release.get('tag_name')} 不是最新 release（当前为 {info.get('version')}），忽略")
+        return "not_latest"
+    return await _apply_remote_info(item, info)
+
+
+async def _poll_rest(items) -> List[str]:
+    results = []
+    for item in items:
+        info = await get_remote_info(item.repository, etag=item.etag, last_modified=item.last_modified)
+        results.append(await _apply_remote_info(item, info))
+    return results
 
 
-async def _download_repo_links(repo_item) -> bool:
-    repo = repo_item.repository
-    repo_dir = os.path.join(settings.download_root_path, repo_item.path)
-    tmp_dir = f"{repo_dir}.tmp-{uuid4().hex}"
+async def _poll_http(items) -> List[str]:
+    results = []
+    for item in items:
+        info = await get_url_info(item.repository, etag=item.etag, last_modified=item.last_modified)
+        results.append(await _apply_remote_info(item, info))
+    return results
 
-    ok = await run_db_session(
-        promote_status,
-        repo,
-        "PENDING",
-        "DOWNLOADING",
-        start_at=get_bj_now(),
+
+async def _poll_graphql(items) -> List[str]:
+    infos = await get_remote_infos_graphql([item.repository for item in items])
+    return [
+        await _apply_remote_info(item, infos.get(item.repository, {"error": "missing"}))
+        for item in items
+    ]
+
+
+async def fetch_github_remote_info(repos: Optional[Iterable[str]] = None) -> None:
+    """检查仓库新版本；repos 为空时检查全部，否则只检查到期的这些仓库。"""
+    wanted = set(repos) if repos is not None else None
+    items = await run_db_session(get_all_list_items)
+    targets = []
+    for item in items:
+        if wanted is not None and item.repository not in wanted:
+            continue
+        if not item.enabled:
+            poll_queue.discard(item.repository)
+        elif item.status != "FREE":
+            # 下载中的仓库本轮跳过，按原节奏顺延
+            poll_queue.schedule_in(item.repository, compute_poll_interval(item.release_history))
+        else:
+            targets.append(item)
+    if not targets:
+        return
+
+    # HTTP 源与 REST 每个仓库一个任务；GraphQL 每批 graphql_batch_size 个仓库一个任务
+    github = [item for item in targets if item.source != "http"]
+    batches = [(_poll_http, [item]) for item in targets if item.source == "http"]
+    if settings.github_backend.lower() == "graphql":
+        size = max(1, settings.graphql_batch_size)
+        batches += [(_poll_graphql, github[i:i + size]) for i in range(0, len(github), size)]
+    else:
+        batches += [(_poll_rest, [item]) for item in github]
+
+    sem = asyncio.Semaphore(max(1, settings.poll_concurrency))
+
+    async def _guarded(poll, batch) -> List[str]:
+        async with sem:
+            try:
+                return await poll(batch)
+            except Exception as e:
+                logger.exception(f"检查 {', '.join(i.repository for i in batch)} 时发生异常：{e}")
+                return [type(e).__name__] * len(batch)
+
+    started = time.monotonic()
+    results: Counter = Counter()
+    for fut in asyncio.as_completed([_guarded(poll, batch) for poll, batch in batches]):
+        results.update(await fut)
+    elapsed = time.monotonic() - started
+
+    ok_kinds = ("updated", "unchanged", "not_modified")
+    failures = {kind: n for kind, n in results.items() if kind not in ok_kinds}
+    failure_text = "，".join(f"{kind}={n}" for kind, n in sorted(failures.items())) or "无"
+    logger.info(
+        f"本轮仓库检查完成（{settings.github_backend}）：共 {len(targets)} 个，耗时 {elapsed:.1f}s，"
+        f"{len(targets) / elapsed if elapsed > 0 else 0:.2f} 个/秒，"
+        f"新版本 {results['updated']}，未变化 {results['unchanged']}，304 {results['not_modified']}，"
+        f"失败 {sum(failures.values())}（{failure_text}）"
     )
-    if not ok:
-        logger.info(f"[{repo}] 已被其他任务处理，跳过")
-        return False
+    logger.info(f"HTTP 连接池：{format_http_stats()}")
+    if failures:
+        logger.info(f"熔断与重试：{format_resilience_stats()}")
+
+
+def resume_tmp_dir(item) -> str:
+    """每个版本固定的临时目录，失败或重启后可以在其中断点续传。"""
+    repo_dir = os.path.join(settings.download_root_path, item.path)
+    return f"{repo_dir}.tmp-{safe_tag(item.new_version)}"
+
+
+def _prune_tmp_dir(tmp_dir: str, expected: set) -> None:
+    """去掉上次尝试遗留、本次不再需要的文件（发布内容变化时）。"""
+    for name in os.listdir(tmp_dir):
+        base = name[:-len(MANIFEST_SUFFIX)] if name.endswith(MANIFEST_SUFFIX) else name
+        if base in expected or name == ".gda-started":
+            continue
+        path = os.path.join(tmp_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
 
+async def _fetch_release(repo: str, repo_dir: str) -> Optional[tuple]:
+    """
+    DOWNLOADING 阶段：把待发布版本的全部文件准备到临时目录并收进去重存储，
+    返回 (item, links, tmp_dir)；失败时已更新好状态并返回 None。
+    """
     fresh = await run_db_session(refresh_item, repo)
     if not fresh:
         logger.warning(f"[{repo}] 记录不存在，跳过")
-        return False
+        return None
 
-    links = fresh.links or []
+    links = [link_meta(link) for link in fresh.links or []]
     if not links:
         logger.error(f"[{repo}] 下载链接不存在，重置为 FREE")
         await run_db_session(update_list_item, repo, status="FREE")
-        return False
+        return None
+
+    tmp_dir = resume_tmp_dir(fresh)
+
+    # 预发布已预取过同一 tag：原子移动到临时目录，校验通过的文件不再下载
+    staged = await take_staged(fresh, fresh.new_version, links)
+    staged_names: set = set()
+    if staged:
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.rename(staged[0], tmp_dir)
+            staged_names = staged[1]
+            logger.info(f"[{repo}] 使用预取的 {fresh.new_version}（{len(staged_names)}/{len(links)} 个文件）")
+        except OSError as e:
+            logger.warning(f"[{repo}] 移动预取目录失败，改为正常下载：{e}")
 
     os.makedirs(tmp_dir, exist_ok=True)
+    _prune_tmp_dir(tmp_dir, {link_filename(link["url"]) for link in links})
     try:
         with open(os.path.join(tmp_dir, ".gda-started"), "w", encoding="utf-8") as f:
             f.write(str(time.time()))
     except Exception:
         pass
 
-    sem = asyncio.Semaphore(3)
-
-    async def _one(link: str) -> None:
-        async with sem:
-            filename = link.split("/")[-1]
-            await download_file_async(link, filename, tmp_dir, num_threads=5)
-
+    throttle = throttle_for(repo, fresh.options)
+    job = current_job(repo)
+    if job is not None:
+        job.counter = throttle
+
+    async def _one(link: dict) -> None:
+        filename = link_filename(link["url"])
+        kwargs = dict(
+            num_threads=5,
+            size=link.get("size"),
+            validator=link.get("digest") or link.get("updated_at"),
+            digest=link.get("digest"),
+            throttle=throttle,
+        )
+
+        async def _fetch() -> None:
+            # 文件槽位全进程共享，跨仓库按文件大小排队
+            async with file_slots.acquire(size_priority(link.get("size"))):
+                try:
+                    await download_file_async(link["url"], filename, tmp_dir, **kwargs)
+                except DigestMismatchError as e:
+                    # 只重下这一个文件；再次不一致则交给仓库级的 PENDING 流程
+                    logger.warning(f"[{repo}] {e}，重新下载该文件")
+                    await download_file_async(link["url"], filename, tmp_dir, **kwargs)
+
+        # 去重存储里已有相同内容，或其他仓库正在下载同一内容时，不再重复下载
+        await fetch_once(link.get("digest"), os.path.join(tmp_dir, filename), link.get("size"), _fetch)
+
+    # 与已发布版本相同的文件直接硬链接过来，只下载新增或变化的资产
+    rest = [link for link in links if link_filename(link["url"]) not in staged_names]
+    reused = staged_names | await reuse_unchanged(repo, repo_dir, tmp_dir, rest)
+    tasks = [asyncio.create_task(_one(link)) for link in links if link_filename(link["url"]) not in reused]
     try:
-        await asyncio.gather(*(_one(url) for url in links))
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # 等各文件保存断点，状态由 _download_repo_links 统一回退
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
     except Exception as e:
-        logger.exception(f"[{repo}] 下载出错，回滚为 PENDING：{e}")
+        # 停掉其余文件的下载（进度已记入续传清单），保留临时目录，下次只补下缺失的部分
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.exception(f"[{repo}] 下载出错，回滚为 PENDING，已下载部分保留用于续传：{e}")
         await run_db_session(update_list_item, repo, status="PENDING", start_at=get_bj_now())
-        try:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-        except Exception:
-            pass
-        return False
+        return None
 
+    drop_manifests(tmp_dir)
     downloaded_count = len(os.listdir(tmp_dir))
     if check_path_exists(os.path.join(tmp_dir, ".gda-started")):
         downloaded_count -= 1
@@ -163,32 +413,118 @@ async def _download_repo_links(repo_item) -> bool:
         logger.warning(f"[{repo}] 文件数不匹配({downloaded_count}/{len(links)})，设为 PENDING 等待下次补齐")
         await run_db_session(update_list_item, repo, status="PENDING", start_at=get_bj_now())
         shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+
+    # 收进去重存储：发布目录里的文件都是 blob 的硬链接
+    for link in links:
+        await ingest(os.path.join(tmp_dir, link_filename(link["url"])), link.get("digest"))
+    return fresh, links, tmp_dir
+
+
+async def _download_repo_links(repo_item) -> bool:
+    repo = repo_item.repository
+    repo_dir = os.path.join(settings.download_root_path, repo_item.path)
+
+    ok = await run_db_session(
+        promote_status,
+        repo,
+        "PENDING",
+        "DOWNLOADING",
+        start_at=get_bj_now(),
+    )
+    if not ok:
+        logger.info(f"[{repo}] 已被其他任务处理，跳过")
         return False
 
-    await _safe_clear_dir(repo_dir) 
-    await _move_all(tmp_dir, repo_dir)
-    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        fetched = await _fetch_release(repo, repo_dir)
+    except asyncio.CancelledError:
+        # 超时 / 管理员取消 / 进程退出可能发生在任何一个 await 上：DOWNLOADING 回退为 PENDING，下次从断点继续
+        await run_db_session(promote_status, repo, "DOWNLOADING", "PENDING", start_at=get_bj_now())
+        job = current_job(repo)
+        logger.warning(f"[{repo}] 下载已取消，本次传输 {job.bytes if job else 0} 字节，断点已保存")
+        raise
+    if fetched is None:
+        return False
+    fresh, links, tmp_dir = fetched
+
+    job = current_job(repo)
+    if job is not None:
+        # 发布阶段不允许取消，避免目录被清空一半
+        job.publishing = True
+    try:
+        if settings.release_versions_keep > 0:
+            # 整个版本目录一次 rename 到位，再原子切换仓库目录的符号链接，不会出现空目录或半个版本
+            await asyncio.to_thread(publish_version, fresh.path, tmp_dir, fresh.new_version)
+            schedule_prune(fresh.path)
+        else:
+            await _safe_clear_dir(repo_dir) 
+            await _move_all(tmp_dir, repo_dir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except OSError as e:
+        # 文件已收进去重存储，下次重试时直接链接回来，不会整版重新下载
+        logger.exception(f"[{repo}] 发布失败，回滚为 PENDING：{e}")
+        await run_db_session(promote_status, repo, "DOWNLOADING", "PENDING", start_at=get_bj_now())
+        return False
+    save_asset_manifest(repo, links)
 
     await run_db_session(update_list_item, repo, status="DONE", end_at=get_bj_now())
     return True
 
 
-async def prepare_github_download() -> None:
-    items = await run_db_session(get_all_list_items)
-    for item in items:
-        if not item.enabled or item.status != "PENDING":
-            continue
+def _pending_bytes(item) -> float:
+    """仓库待下载的总字节数，用于跨仓库排队（小的先下）。"""
+    sizes = [link_meta(link).get("size") for link in item.links or []]
+    return size_priority(sum(sizes) if sizes and None not in sizes else None)
 
-        lock = repo_lock(item.repository)
+
+async def _download_pending(repo: str) -> None:
+    item = await run_db_session(refresh_item, repo)
+    if not item or not item.enabled or item.status != "PENDING":
+        return
+    async with repo_slots.acquire(_pending_bytes(item)):
+        lock = repo_lock(repo)
         async with lock:
-            fresh = await run_db_session(refresh_item, item.repository)
+            fresh = await run_db_session(refresh_item, repo)
             if not fresh or fresh.status != "PENDING":
-                continue
+                return
             logger.info(f"准备下载 {fresh.name} 新版本 {fresh.new_version}")
-            ok = await _download_repo_links(fresh)
-        
-        if ok:
-            await check_download(fresh)
+            # 被单独取消时返回 None，状态已回退为 PENDING
+            ok = await run_download(repo, _download_repo_links(fresh))
+
+    if ok:
+        await check_download(fresh)
+
+
+def submit_download(repo: str) -> bool:
+    """仓库变为 PENDING 时立即交给常驻下载调度，不等待下载完成。"""
+    return queue_download(repo, partial(_download_pending, repo))
+
+
+async def prepare_github_download() -> None:
+    """
+    把所有 PENDING 仓库交给常驻的全局下载调度后立即返回：各仓库按总大小排队等槽位，
+    同时下载数受 download_max_repos 限制，新变为 PENDING 的小仓库不必等上一批大仓库下完。
+    """
+    items = await run_db_session(get_all_list_items)
+    pending = [item for item in items if item.enabled and item.status == "PENDING"]
+    pending.sort(key=_pending_bytes)
+    added = sum(submit_download(item.repository) for item in pending)
+    if added:
+        logger.info(f"{added} 个仓库加入下载队列，按大小排队")
+
+
+def _size_mismatch(download_path: str, links: list) -> bool:
+    """按 release 元数据中的大小检查已发布文件，截断的文件不再被当作完整。"""
+    for link in map(link_meta, links):
+        if link.get("size") is None:
+            continue
+        try:
+            if os.path.getsize(os.path.join(download_path, link_filename(link["url"]))) != link["size"]:
+                return True
+        except OSError:
+            return True
+    return False
 
 
 async def check_download(item) -> None:
@@ -209,7 +545,7 @@ async def check_download(item) -> None:
             logger.warning(f'{item.name} 下载文件为空，重置状态为 PENDING')
             await run_db_session(update_list_item, item.repository, status="PENDING", start_at=get_bj_now())
             return
-        elif files_count != len(item.links or []):
+        elif files_count != len(item.links or []) or _size_mismatch(download_path, item.links or []):
             logger.warning(f'{item.name} 下载文件不完整，重置状态为 PENDING')
             await run_db_session(update_list_item, item.repository, status="PENDING", start_at=get_bj_now())
             return
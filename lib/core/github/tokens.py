@@ -0,0 +1,160 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import get_api_header
+
+# 额度耗尽但响应头没给出重置时间（或还没收到过）时，按这个时长后重试
+UNKNOWN_RESET_SECONDS = 60
+
+
+class _TokenState:
+    __slots__ = ("token", "resource", "limit", "remaining", "reset_at")
+
+    def __init__(self, token: str, resource: str):
+        self.token = token
+        self.resource = resource
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None  # None 表示尚未从响应头得知额度
+        self.reset_at: float = 0.0
+
+    def budget(self, now: float) -> float:
+        if self.reset_at and now >= self.reset_at:
+            # 已过重置时间，额度视为恢复，等下一次响应头校准
+            self.remaining = None
+            self.reset_at = 0.0
+        if self.remaining is not None and self.remaining <= 0 and not self.reset_at:
+            # 不知道何时重置：给一个有限的等待窗口，否则 acquire() 会一直以 1s 间隔空转
+            self.reset_at = now + UNKNOWN_RESET_SECONDS
+        if self.remaining is None:
+            return float("inf")
+        return self.remaining
+
+
+class TokenPool:
+    """
+    多 token 额度管理：根据响应头 X-RateLimit-Remaining / X-RateLimit-Reset 跟踪每个
+    token 在各资源（core / graphql）上的剩余额度，请求总是分给剩余额度最多的 token；
+    全部耗尽时 acquire() 会挂起到最早的重置时间，从而暂停整条轮询流水线。
+    """
+
+    def __init__(self, tokens: List[str]):
+        self._tokens = list(dict.fromkeys(t for t in tokens if t)) or [""]
+        self._states: Dict[Tuple[str, str], _TokenState] = {}
+        self._paused_until: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._tokens)
+
+    def _state(self, token: str, resource: str) -> _TokenState:
+        key = (token, resource)
+        state = self._states.get(key)
+        if state is None:
+            state = _TokenState(token, resource)
+            self._states[key] = state
+        return state
+
+    async def acquire(self, resource: str = "core") -> str:
+        while True:
+            now = time.time()
+            states = [self._state(t, resource) for t in self._tokens]
+            best = max(states, key=lambda s: s.budget(now))
+            if best.budget(now) > 0:
+                if best.remaining is not None:
+                    best.remaining -= 1  # 预占一次，响应回来后以响应头为准
+                return best.token
+
+            resume_at = min(s.reset_at for s in states)
+            wait = max(1.0, resume_at - now + 1)
+            if resume_at > self._paused_until:
+                self._paused_until = resume_at
+                logger.warning(
+                    f"所有 GitHub token 的 {resource} 额度已耗尽，暂停请求 {int(wait)}s 直到额度重置"
+                )
+            await asyncio.sleep(wait)
+
+    def update(self, token: str, headers, status: Optional[int] = None) -> None:
+        resource = headers.get("X-RateLimit-Resource", "core")
+        state = self._state(token, resource)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        limit = headers.get("X-RateLimit-Limit")
+        if remaining is not None and remaining.isdigit():
+            state.remaining = int(remaining)
+        if reset is not None and reset.isdigit():
+            state.reset_at = float(reset)
+        if limit is not None and limit.isdigit():
+            state.limit = int(limit)
+
+        # 次级限流只给 Retry-After，按该时长把 token 视为耗尽
+        retry_after = headers.get("Retry-After")
+        if status in (403, 429) and retry_after and retry_after.isdigit():
+            state.remaining = 0
+            state.reset_at = max(state.reset_at, time.time() + int(retry_after))
+
+    @staticmethod
+    def is_rate_limited(headers, status: int) -> bool:
+        if status not in (403, 429):
+            return False
+        return headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in headers
+
+    def snapshot(self) -> List[dict]:
+        now = time.time()
+        rows = []
+        for (token, resource), state in sorted(self._states.items(), key=lambda kv: kv[0][1]):
+            state.budget(now)
+            rows.append({
+                "token": f"{token[:4]}…{token[-4:]}" if len(token) > 8 else "****",
+                "resource": resource,
+                "remaining": state.remaining,
+                "limit": state.limit,
+                "reset_in": max(0, int(state.reset_at - now)) if state.reset_at else 0,
+            })
+        return rows
+
+
+@asynccontextmanager
+async def request_with_pool(
+    session: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    resource: str = "core",
+    headers: Optional[dict] = None,
+    **kwargs,
+) -> AsyncIterator[Optional[aiohttp.ClientResponse]]:
+    """
+    用 token 池发一个 GitHub API 请求：按响应头更新所用 token 的额度，被限流时换一个 token 重试，
+    全部耗尽时 acquire() 会等待额度重置。重试 size + 1 次仍被限流时产出 None，由调用方决定如何处理。
+    """
+    for _ in range(token_pool.size + 1):
+        token = await token_pool.acquire(resource)
+        request_headers = {**get_api_header(token), **(headers or {})}
+        async with session.request(method, url, headers=request_headers, **kwargs) as resp:
+            token_pool.update(token, resp.headers, resp.status)
+            if TokenPool.is_rate_limited(resp.headers, resp.status):
+                logger.warning(f"{url} 请求触发限流，切换 token 重试")
+                continue
+            yield resp
+            return
+    yield None
+
+
+def format_token_pool() -> str:
+    rows = token_pool.snapshot()
+    if not rows:
+        return f"{token_pool.size} 个 token，尚无额度数据"
+    parts = [
+        f"{r['token']}[{r['resource']}] {r['remaining'] if r['remaining'] is not None else '?'}"
+        f"/{r['limit'] or '?'}（{r['reset_in']}s 后重置）"
+        for r in rows
+    ]
+    return "；".join(parts)
+
+
+token_pool = TokenPool([settings.github_token] + [t.strip() for t in settings.github_tokens.split(",")])
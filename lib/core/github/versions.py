@@ -0,0 +1,134 @@
+import os
+import time
+import errno
+import shutil
+import asyncio
+from typing import Dict
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import store_dir, move_legacy_dir
+from lib.core.github.release import safe_tag
+
+# 仓库目录 -> 正在后台清理旧版本的任务
+_prune_tasks: Dict[str, asyncio.Task] = {}
+
+
+def versions_root(path: str) -> str:
+    """仓库的各版本目录存放在 store_path/versions/<folder>/<tag>，openlist 只能通过仓库目录的符号链接看到当前版本。"""
+    return store_dir("versions", path)
+
+
+def _point(link: str, target: str) -> None:
+    """原子地把 link 指向 target（相对路径，挂载到其他路径下也能用）。"""
+    tmp = link + ".gda-switch"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.relpath(target, os.path.dirname(link)), tmp)
+    os.replace(tmp, link)
+
+
+def _move_dir(src: str, dst: str) -> None:
+    """rename 目录；store_path 与下载目录不在同一文件系统时先完整复制到目标旁边，再一次 rename 到位。"""
+    try:
+        os.rename(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    copying = dst + ".gda-copy"
+    shutil.rmtree(copying, ignore_errors=True)
+    shutil.copytree(src, copying, symlinks=True)
+    os.rename(copying, dst)
+    shutil.rmtree(src, ignore_errors=True)
+
+
+def publish_version(path: str, tmp_dir: str, tag: str) -> str:
+    """
+    把下载完成的 tmp_dir 整个 rename 成一个不再修改的版本目录，再把仓库目录（符号链接）原子切换过去；
+    旧布局中的普通目录先整体移进版本目录保留。返回新版本目录。
+    """
+    repo_dir = os.path.join(settings.download_root_path, path)
+    root = versions_root(path)
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, safe_tag(tag))
+    if os.path.lexists(target):
+        # 同一版本重新同步：版本目录不可修改，另起一个
+        target = f"{target}-{int(time.time())}"
+    _move_dir(tmp_dir, target)
+    # 记录发布时间，保留最近的版本时按它排序
+    os.utime(target)
+    if os.path.isdir(repo_dir) and not os.path.islink(repo_dir):
+        legacy = os.path.join(root, f"legacy-{int(time.time())}")
+        _move_dir(repo_dir, legacy)
+        logger.info(f"{repo_dir} 迁移为版本目录布局，原有文件保留在 {legacy}")
+    _point(repo_dir, target)
+    return target
+
+
+def prune_versions(path: str, keep: int) -> int:
+    """只保留最近发布的 keep 个版本（当前版本总是保留），返回删除的数量。"""
+    root = versions_root(path)
+    if not os.path.isdir(root):
+        return 0
+    current = os.path.realpath(os.path.join(settings.download_root_path, path))
+    entries = sorted(
+        (os.path.join(root, name) for name in os.listdir(root)),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    removed = 0
+    for old in entries[max(1, keep):]:
+        if not os.path.isdir(old) or os.path.realpath(old) == current:
+            continue
+        shutil.rmtree(old, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def schedule_prune(path: str) -> None:
+    """在后台清理超出保留数量的旧版本，不阻塞发布流程。"""
+    task = _prune_tasks.get(path)
+    if task and not task.done():
+        return
+
+    async def _run() -> None:
+        try:
+            removed = await asyncio.to_thread(prune_versions, path, settings.release_versions_keep)
+        except OSError as e:
+            logger.warning(f"清理 {path} 的旧版本失败：{e}")
+            return
+        if removed:
+            logger.info(f"{path} 清理旧版本 {removed} 个，保留最近 {settings.release_versions_keep} 个")
+
+    _prune_tasks[path] = asyncio.create_task(_run())
+
+
+def rename_versions(old_path: str, new_path: str) -> None:
+    """仓库 folder 改名时连同版本目录一起移动，并重新指向当前版本。"""
+    old_link = os.path.join(settings.download_root_path, old_path)
+    new_link = os.path.join(settings.download_root_path, new_path)
+    current = os.path.basename(os.path.realpath(old_link))
+    old_root, new_root = versions_root(old_path), versions_root(new_path)
+    if os.path.isdir(old_root):
+        os.makedirs(os.path.dirname(new_root), exist_ok=True)
+        os.rename(old_root, new_root)
+    os.remove(old_link)
+    os.makedirs(os.path.dirname(new_link), exist_ok=True)
+    _point(new_link, os.path.join(new_root, current))
+
+
+def migrate_legacy_versions() -> None:
+    """把 download_root_path/.gda-versions 移到 store_dir("versions")，并重新指向仓库目录链接。"""
+    legacy = os.path.join(settings.download_root_path, ".gda-versions")
+    new = store_dir("versions")
+    if not move_legacy_dir(legacy, new):
+        return
+    for base, dirs, files in os.walk(settings.download_root_path):
+        for name in dirs + files:
+            link = os.path.join(base, name)
+            if not os.path.islink(link):
+                continue
+            target = os.path.normpath(os.path.join(base, os.readlink(link)))
+            if target.startswith(legacy + os.sep):
+                _point(link, new + target[len(legacy):])
@@ -0,0 +1,98 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from lib.log import logger
+from lib.conf import settings
+from lib.utils import get_header_without_token, get_http_session, call_with_retry, CircuitOpenError
+from lib.core.github.release import normalize_http_asset, build_release_info
+
+
+def _to_iso(http_date: Optional[str]) -> Optional[str]:
+    try:
+        return parsedate_to_datetime(http_date).isoformat() if http_date else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _version_from(etag: Optional[str], last_modified: Optional[str], size: Optional[int]) -> Optional[str]:
+    """用校验值充当版本号：优先 ETag，其次 Last-Modified，最后 Content-Length。"""
+    if etag:
+        return etag.removeprefix("W/").strip('"')
+    if last_modified:
+        return _to_iso(last_modified) or last_modified
+    if size is not None:
+        return f"size-{size}"
+    return None
+
+
+async def get_url_info(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    通用 HTTP 源：发送带 If-None-Match / If-Modified-Since 的 HEAD，
+    未变化时只花一次 HEAD、不传输文件内容；返回结构与 get_remote_info 一致。
+    """
+    timeout = aiohttp.ClientTimeout(total=settings.poll_timeout_seconds)
+    headers = get_header_without_token()
+    headers["Accept-Encoding"] = "identity"
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    async def _request() -> tuple:
+        session = get_http_session()
+        async with session.head(url, headers=headers, timeout=timeout, allow_redirects=True) as resp:
+            if resp.status in (405, 501):
+                # 不支持 HEAD 的服务器：GET 只读响应头，不读取正文
+                async with session.get(url, headers=headers, timeout=timeout) as get_resp:
+                    get_resp.raise_for_status()
+                    return get_resp.status, get_resp.headers
+            if resp.status != 304:
+                resp.raise_for_status()
+            return resp.status, resp.headers
+
+    try:
+        status, resp_headers = await call_with_retry(url, _request)
+    except CircuitOpenError:
+        return {"error": "circuit_open"}
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"HTTP 源请求失败 ({url}): {e.status} {e.message}")
+        return {"error": f"http_{e.status}"}
+    except asyncio.TimeoutError:
+        logger.error(f"检查 HTTP 源 {url} 超时")
+        return {"error": "timeout"}
+    except aiohttp.ClientError as e:
+        logger.error(f"检查 HTTP 源 {url} 失败：{e}")
+        return {"error": "network"}
+
+    if status == 304:
+        return {"not_modified": True}
+
+    new_etag = resp_headers.get("ETag")
+    new_last_modified = resp_headers.get("Last-Modified")
+    length = resp_headers.get("Content-Length")
+    size = int(length) if length and length.isdigit() else None
+    version = _version_from(new_etag, new_last_modified, size)
+    if version is None:
+        logger.warning(f"HTTP 源 {url} 没有 ETag / Last-Modified / Content-Length，无法判断是否更新")
+        return {"error": "no_validators"}
+
+    infos = build_release_info(
+        version,
+        [normalize_http_asset({
+            "url": url,
+            "size": size,
+            "content_type": resp_headers.get("Content-Type"),
+            "updated_at": _to_iso(new_last_modified),
+        })],
+        published_at=_to_iso(new_last_modified),
+    )
+    infos["etag"] = new_etag
+    infos["last_modified"] = new_last_modified
+    return infos
@@ -1,5 +1,5 @@
 from .db import init_db, async_session, run_db_session
-from .model import ListItem, GroupItem
+from .model import ListItem, GroupItem, OwnerItem
 from .crud.list import (
     get_all_list_items, 
     get_list_item_by_id, 
@@ -18,12 +18,20 @@ from .crud.group import (
     update_group_item_by_chat_id,
     get_group_item_by_chat_id
 )   
+from .crud.owner import (
+    get_all_owner_items,
+    get_owner_item,
+    create_owner_item,
+    update_owner_item,
+    get_list_items_by_owner
+)
 __all__ = [
     "init_db", 
     "async_session",
     "run_db_session",
     "ListItem",
     "GroupItem",
+    "OwnerItem",
     "get_all_list_items",
     "get_list_item_by_id",
     "get_list_item_by_repository",
@@ -37,5 +45,10 @@ __all__ = [
     "create_group_item",
     "update_group_item",
     "update_group_item_by_chat_id",
-    "get_group_item_by_chat_id"
+    "get_group_item_by_chat_id",
+    "get_all_owner_items",
+    "get_owner_item",
+    "create_owner_item",
+    "update_owner_item",
+    "get_list_items_by_owner"
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from lib.db.model import OwnerItem, ListItem
+from sqlmodel import select
+
+async def get_all_owner_items(session: AsyncSession) -> List[OwnerItem]:
+    result = await session.exec(select(OwnerItem))
+    return result.all()
+
+async def get_owner_item(session: AsyncSession, owner: str) -> Optional[OwnerItem]:
+    result = await session.exec(select(OwnerItem).where(OwnerItem.owner == owner))
+    return result.first()
+
+async def create_owner_item(session: AsyncSession, item: OwnerItem) -> OwnerItem:
+    session.add(item)
+    await session.commit()
+    await session.refresh(item)
+    return item
+
+async def update_owner_item(session: AsyncSession, owner: str, **kwargs) -> Optional[OwnerItem]:
+    item = await get_owner_item(session, owner)
+    if item:
+        for key, value in kwargs.items():
+            setattr(item, key, value)
+        session.add(item)
+        await session.commit()
+        await session.refresh(item)
+    return item
+
+async def get_list_items_by_owner(session: AsyncSession, owner: str) -> List[ListItem]:
+    result = await session.exec(select(ListItem).where(ListItem.owner == owner))
+    return result.all()
@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from lib.conf.config import settings
-from .model import ListItem
+from .model import ListItem, OwnerItem
 from typing import AsyncGenerator
 
 
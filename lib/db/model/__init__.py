@@ -1,4 +1,5 @@
 from .list import ListItem
 from .group import GroupItem
+from .owner import OwnerItem
 
-__all__ = ["ListItem", "GroupItem"]
\ No newline at end of file
+__all__ = ["ListItem", "GroupItem", "OwnerItem"]
\ No newline at end of file
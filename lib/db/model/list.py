@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlmodel import Field
 from sqlalchemy.dialects.mysql import JSON
 from datetime import datetime
@@ -12,9 +12,15 @@ class ListItem(ManagedBase, table=True):
     version: str = Field(default='0', description="版本号", sa_column_kwargs={"comment": "版本号"})
     new_version: str = Field(default='0', description="最新版本号", sa_column_kwargs={"comment": "最新版本号"})
     repository: str = Field(unique=True, description="仓库地址", sa_column_kwargs={"comment": "仓库地址"})
+    source: str = Field(default="github", description="下载源类型", sa_column_kwargs={"comment": "下载源类型：github / http", "server_default": "github"})
     path: str = Field(description="存放子路径", sa_column_kwargs={"comment": "存放子路径"})
     status: str = Field(default="FREE", description="状态", sa_column_kwargs={"comment": "状态"})
     links: Optional[Dict[str, Any]] = Field(default=None, description="下载链接", sa_column=Column(JSON, comment="下载链接"))
     start_at: datetime = Field(default_factory=get_bj_now, description="开始时间", sa_column_kwargs={"comment": "开始时间"})
     end_at: datetime = Field(default_factory=get_bj_now, description="结束时间", sa_column_kwargs={"comment": "结束时间"})
     enabled: bool = Field(default=True, description="是否启用", sa_column_kwargs={"comment": "是否启用"})
+    etag: Optional[str] = Field(default=None, description="ETag", sa_column_kwargs={"comment": "上次响应的ETag"})
+    last_modified: Optional[str] = Field(default=None, description="Last-Modified", sa_column_kwargs={"comment": "上次响应的Last-Modified"})
+    options: Optional[Dict[str, Any]] = Field(default=None, description="仓库配置", sa_column=Column(JSON, comment="config.yaml 中的仓库配置项"))
+    owner: Optional[str] = Field(default=None, index=True, description="来源用户/组织", sa_column_kwargs={"comment": "通过用户/组织自动发现时的来源"})
+    release_history: Optional[List[str]] = Field(default=None, description="发布历史", sa_column=Column(JSON, comment="最近观察到的发布时间"))
@@ -0,0 +1,14 @@
+from typing import Optional, List, Dict, Any
+from sqlmodel import Field
+from sqlalchemy.dialects.mysql import JSON
+from sqlalchemy import Column
+from lib.db.base import ManagedBase
+
+class OwnerItem(ManagedBase, table=True):
+    id: Optional[int] = Field(primary_key=True, description="ID", sa_column_kwargs={"comment": "ID"})
+    owner: str = Field(index=True, unique=True, description="用户或组织", sa_column_kwargs={"comment": "用户或组织"})
+    folder: str = Field(description="存放父路径", sa_column_kwargs={"comment": "存放父路径"})
+    pattern: Optional[str] = Field(default=None, description="仓库名过滤正则", sa_column_kwargs={"comment": "仓库名过滤正则"})
+    include_forks: bool = Field(default=False, description="是否包含fork仓库", sa_column_kwargs={"comment": "是否包含fork仓库"})
+    enabled: bool = Field(default=True, description="是否启用", sa_column_kwargs={"comment": "是否启用"})
+    pages: Optional[List[Dict[str, Any]]] = Field(default=None, description="仓库列表分页缓存", sa_column=Column(JSON, comment="仓库列表分页缓存(ETag与仓库)"))
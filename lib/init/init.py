@@ -1,43 +1,103 @@
 from lib.conf import check_yaml_exists, yaml_config_fillter, settings
 from lib.db import ListItem, run_db_session, create_list_item, get_list_item_by_repository, update_list_item
+from lib.db import OwnerItem, get_owner_item, create_owner_item, update_owner_item, get_list_items_by_owner
 from lib.log import logger
+from lib.core.github.release import link_filename
+from lib.core.github.versions import rename_versions, migrate_legacy_versions
+from lib.core.github.prefetch import migrate_legacy_staging
+from lib.utils import store_dir, migrate_legacy_blobs
 import os
 
+def _repo_name(repo: dict, source: str) -> str:
+    """github 源取仓库名；http 源的 name 是下载地址，取文件名。"""
+    if source == 'http':
+        return link_filename(repo['name'])
+    return repo['name'].strip('/').split('/')[-1]
+
+def _repo_options(repo: dict) -> dict:
+    """config 中除 folder 以外的配置项原样存入 ListItem.options，供下载/过滤等功能读取。"""
+    return {k: v for k, v in (repo.get('config') or {}).items() if k != 'folder'}
+
 async def init_config():
     if not check_yaml_exists():
         return None
-    config = yaml_config_fillter('repositories')
+    config = yaml_config_fillter('repositories', [])
     for repo in config:
         exist = await run_db_session(get_list_item_by_repository, repo['name'])
+        source = str(repo.get('source', 'github')).lower()
         if not exist:
-            name = repo['name'].strip('/').split('/')[-1]
+            name = _repo_name(repo, source)
             enabled = repo.get('enable', False)
             path = repo['config'].get('folder', name)
             logger.info(f'初始化添加仓库：{name}')
             await run_db_session(create_list_item, ListItem(
                 name=name,
                 repository=repo['name'],
+                source=source,
                 path=path,
-                enabled=enabled
+                enabled=enabled,
+                options=_repo_options(repo)
             ))
         else:
-            name = repo['name'].strip('/').split('/')[-1]
+            name = _repo_name(repo, source)
             enabled = repo.get('enable', False)
             path = repo['config'].get('folder', name)
+            options = _repo_options(repo)
             if exist.enabled != enabled:
                 exist.enabled = enabled
                 logger.info(f'更新仓库状态：{exist.name} -> {"启用" if enabled else "禁用"}')
                 await run_db_session(update_list_item, repo['name'], enabled=enabled)
             if exist.path != path:
                 logger.info(f'更新仓库路径：{exist.path} -> {path}')
-                if os.path.exists(settings.download_root_path+exist.path):
+                if os.path.islink(settings.download_root_path+exist.path):
+                    rename_versions(exist.path, path)
+                elif os.path.exists(settings.download_root_path+exist.path):
                     os.rename(settings.download_root_path+exist.path, settings.download_root_path+path)
                 await run_db_session(update_list_item, repo['name'], path=path)
+            if exist.source != source:
+                logger.info(f'更新下载源类型：{exist.name} -> {source}')
+                await run_db_session(update_list_item, repo['name'], source=source, etag=None, last_modified=None)
+            if (exist.options or {}) != options:
+                logger.info(f'更新仓库配置：{exist.name}')
+                # 资产过滤规则可能变了：清掉条件请求缓存，下次检查拿到完整 release 重新计算下载链接
+                await run_db_session(update_list_item, repo['name'], options=options, etag=None, last_modified=None)
+
+    await init_owner_config()
+
+
+async def init_owner_config():
+    """owners：按用户/组织监听其全部仓库（可按仓库名正则过滤），仓库列表增量发现。"""
+    config = yaml_config_fillter('owners', [])
+    for entry in config:
+        owner = entry['owner'].strip('/')
+        conf = entry.get('config') or {}
+        fields = dict(
+            folder=conf.get('folder', owner),
+            pattern=conf.get('pattern'),
+            include_forks=bool(conf.get('forks', False)),
+            enabled=entry.get('enable', False),
+        )
+        exist = await run_db_session(get_owner_item, owner)
+        if not exist:
+            logger.info(f'初始化添加用户/组织：{owner}')
+            await run_db_session(create_owner_item, OwnerItem(owner=owner, **fields))
+        elif any(getattr(exist, k) != v for k, v in fields.items()):
+            logger.info(f'更新用户/组织配置：{owner}')
+            # 清空分页缓存，下次发现时按新配置完整重算
+            await run_db_session(update_owner_item, owner, pages=None, **fields)
+            if not fields['enabled']:
+                for item in await run_db_session(get_list_items_by_owner, owner):
+                    await run_db_session(update_list_item, item.repository, enabled=False)
 
 
 def folder_init():
     os.makedirs(settings.session_path, exist_ok=True)
     os.makedirs(settings.download_root_path, exist_ok=True)
+    os.makedirs(settings.state_path, exist_ok=True)
+    os.makedirs(store_dir(), exist_ok=True)
+    migrate_legacy_blobs()
+    migrate_legacy_versions()
+    migrate_legacy_staging()
 
 async def boot():
     folder_init()
@@ -1,8 +1,10 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from .schedule import setup_scheduler, schedule_one_off, scheduler
 from .task.clean import check_and_clean_downloads
+from .task.repo import run_due_poller
+from .downloads import cancel_all_downloads
 
 
 
 
-__all__ = ["scheduler", "schedule_one_off", "check_and_clean_downloads"]
\ No newline at end of file
+__all__ = ["scheduler", "schedule_one_off", "check_and_clean_downloads", "run_due_poller", "cancel_all_downloads"]
\ No newline at end of file
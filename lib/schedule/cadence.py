@@ -0,0 +1,132 @@
+import time
+import heapq
+import random
+import asyncio
+import statistics
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from lib.conf import settings
+from lib.utils import get_bj_now, to_bj_aware
+
+HISTORY_SIZE = 10
+# 加密检查窗口在中位间隔的多少倍处结束
+HOT_WINDOW_END = 2.0
+# 加密检查的间隔占中位间隔的比例：窗口随间隔变长，每个窗口内的检查次数保持在百次左右
+HOT_INTERVAL_RATIO = 0.01
+
+
+def _parse_times(history: Optional[Iterable[str]]) -> List[datetime]:
+    times = []
+    for ts in history or []:
+        try:
+            times.append(to_bj_aware(datetime.fromisoformat(str(ts).replace("Z", "+00:00"))))
+        except ValueError:
+            continue
+    return sorted(times)
+
+
+def append_release_history(history: Optional[List[str]], observed_at: Optional[str]) -> List[str]:
+    """记录一次新版本的发布时间（优先用 release 的 published_at），只保留最近 HISTORY_SIZE 条。"""
+    stamp = observed_at or get_bj_now().isoformat()
+    merged = list(history or []) + [stamp]
+    times = _parse_times(merged)
+    return [t.isoformat() for t in times[-HISTORY_SIZE:]]
+
+
+def compute_poll_interval(history: Optional[Iterable[str]], now: Optional[datetime] = None) -> float:
+    """
+    根据发布历史计算下次检查间隔（秒）：
+    - 历史不足两条时使用默认间隔；
+    - 否则取发布间隔中位数 * poll_interval_ratio；
+    - 临近预计的下次发布时间（中位间隔的 0.9 ~ 2 倍之间）时加密检查，间隔为中位间隔 * HOT_INTERVAL_RATIO；
+    - 超过这个窗口仍未发布则按几何级数退避到最大间隔，停更的仓库不会一直被高频检查；
+    - 结果限制在 [poll_min_interval_seconds, poll_max_interval_seconds] 并加入随机抖动。
+    """
+    now = now or get_bj_now()
+    lo, hi = settings.poll_min_interval_seconds, settings.poll_max_interval_seconds
+    times = _parse_times(history)
+
+    if len(times) < 2:
+        interval = settings.poll_default_interval_seconds
+    else:
+        gaps = [(b - a).total_seconds() for a, b in zip(times, times[1:]) if b > a]
+        gap = statistics.median(gaps) if gaps else settings.poll_default_interval_seconds
+        elapsed = (now - times[-1]).total_seconds()
+        if elapsed >= gap * HOT_WINDOW_END:
+            # 超过预计时间很久仍未发布：从常规间隔开始，每多过一个中位间隔翻倍，逐步退到最大间隔
+            overdue = (elapsed - gap * HOT_WINDOW_END) / gap
+            interval = max(lo, gap * settings.poll_interval_ratio) * 2 ** min(overdue, 32)
+        elif elapsed >= gap * 0.9:
+            interval = gap * HOT_INTERVAL_RATIO
+        else:
+            interval = gap * settings.poll_interval_ratio
+            # 不要一次睡过预计发布窗口的起点
+            interval = min(interval, max(lo, gap * 0.9 - elapsed))
+
+    interval = min(max(interval, lo), hi)
+    jitter = settings.poll_jitter_ratio
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+class PollQueue:
+    """按下次检查时间排序的优先队列（小顶堆 + 惰性删除），调度协程只在有仓库到期时醒来。"""
+
+    def __init__(self):
+        self._heap: List[tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, repo: str) -> bool:
+        return repo in self._due
+
+    def schedule(self, repo: str, due_at: float) -> None:
+        self._due[repo] = due_at
+        heapq.heappush(self._heap, (due_at, repo))
+        if self._heap[0] == (due_at, repo):
+            self._changed.set()
+
+    def schedule_in(self, repo: str, seconds: float) -> None:
+        self.schedule(repo, time.time() + seconds)
+
+    def discard(self, repo: str) -> None:
+        self._due.pop(repo, None)
+
+    def _prune(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        repos = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            _, repo = heapq.heappop(self._heap)
+            if self._due.get(repo) is not None:
+                self._due.pop(repo)
+                repos.append(repo)
+            self._prune()
+        return repos
+
+    async def wait(self, timeout: float) -> None:
+        """睡到队首到期或队首被更早的任务替换。"""
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+
+    def snapshot(self, limit: int = 5) -> List[tuple[str, int]]:
+        now = time.time()
+        upcoming = sorted((due, repo) for repo, due in self._due.items())[:limit]
+        return [(repo, int(due - now)) for due, repo in upcoming]
+
+
+poll_queue = PollQueue()
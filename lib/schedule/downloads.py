@@ -0,0 +1,102 @@
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from lib.log import logger
+
+T = TypeVar("T")
+
+# 取消后最多等待多少秒让下载保存断点并回退状态
+_CANCEL_WAIT_SECONDS = 30
+
+
+class DownloadJob:
+    """一个正在进行的仓库下载：counter 提供已传输字节数，publishing 后不再允许取消。"""
+
+    def __init__(self, repo: str, task: asyncio.Task):
+        self.repo = repo
+        self.task = task
+        self.counter = None
+        self.publishing = False
+
+    @property
+    def bytes(self) -> int:
+        return self.counter.bytes if self.counter is not None else 0
+
+
+_jobs: Dict[str, DownloadJob] = {}
+# repo -> 常驻调度中的任务（排队等槽位或正在下载），每个仓库同时只有一个
+_queued: Dict[str, asyncio.Task] = {}
+
+
+def current_job(repo: str) -> Optional[DownloadJob]:
+    return _jobs.get(repo)
+
+
+async def run_download(repo: str, coro: Awaitable[T]) -> Optional[T]:
+    """把仓库下载放进独立任务并登记；被单独取消时返回 None，调用方继续处理其他仓库。"""
+    task = asyncio.create_task(coro)
+    _jobs[repo] = DownloadJob(repo, task)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        # 调用方自己被取消（进程退出）时继续向上传播
+        if asyncio.current_task().cancelling():
+            raise
+        return None
+    finally:
+        job = _jobs.get(repo)
+        if job is not None and job.task is task:
+            del _jobs[repo]
+
+
+def _on_queued_done(repo: str, task: asyncio.Task) -> None:
+    if _queued.get(repo) is task:
+        del _queued[repo]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"[{repo}] 下载流程出错：{task.exception()!r}")
+
+
+def queue_download(repo: str, factory: Callable[[], Awaitable[None]]) -> bool:
+    """把仓库交给常驻调度，不等待其完成；已在排队或下载中时返回 False。"""
+    task = _queued.get(repo)
+    if task is not None and not task.done():
+        return False
+    task = asyncio.create_task(factory())
+    _queued[repo] = task
+    task.add_done_callback(partial(_on_queued_done, repo))
+    return True
+
+
+def queued_downloads() -> List[str]:
+    return list(_queued)
+
+
+async def cancel_download(repo: str, reason: str) -> Optional[int]:
+    """
+    真正取消正在进行的下载：各文件保存断点清单，仓库回退为 PENDING。
+    返回本次已传输的字节数；没有进行中的下载或已进入发布阶段时返回 None。
+    """
+    job = _jobs.get(repo)
+    if job is None or job.task.done() or job.publishing:
+        return None
+    logger.warning(f"[{repo}] {reason}，取消正在进行的下载")
+    job.task.cancel()
+    await asyncio.wait([job.task], timeout=_CANCEL_WAIT_SECONDS)
+    return job.bytes
+
+
+async def cancel_all_downloads(reason: str) -> int:
+    """取消全部进行中的下载，返回合计已传输字节数。"""
+    moved = await asyncio.gather(*(cancel_download(repo, reason) for repo in list(_jobs)))
+    # 还在排队等槽位的仓库没有开始下载，直接取消
+    waiting = [task for task in _queued.values() if not task.done()]
+    for task in waiting:
+        task.cancel()
+    if waiting:
+        await asyncio.wait(waiting, timeout=_CANCEL_WAIT_SECONDS)
+    return sum(m or 0 for m in moved)
+
+
+def download_jobs() -> List[DownloadJob]:
+    return list(_jobs.values())
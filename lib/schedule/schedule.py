@@ -11,8 +11,9 @@ from lib.log import logger
 from uuid import uuid4
 import os
 
-from .task.repo import handle_github_repo, handle_github_download
-from .task.clean import check_and_clean_downloads, cleanup_orphan_tmp_dirs
+from .task.repo import handle_github_repo, handle_github_download, sync_poll_queue
+from .task.clean import check_and_clean_downloads, cleanup_orphan_tmp_dirs, reset_interrupted_downloads
+from lib.core.github.owner import sync_all_owners
 
 
 async def daily_task():
@@ -28,7 +29,8 @@ async def min_twenty_task():
 
 async def hourly_task():
     logger.info("⏰ 每小时定时任务开始执行")
-    await handle_github_repo()
+    # 仓库检查由 run_due_poller 按各仓库的到期时间驱动，这里只同步检查队列
+    await sync_poll_queue()
     logger.info("✅ 每小时定时任务执行完毕")
 
 
@@ -38,8 +40,11 @@ async def minutely_task():
 
 async def startup_task():
     logger.info("🚀 启动后初始化任务开始执行")
+    await reset_interrupted_downloads()
     await check_and_clean_downloads()
+    await sync_all_owners()
     await handle_github_repo()
+    await sync_poll_queue()
     await handle_github_download()
     logger.info("✅ 启动后初始化任务执行完毕")
 
@@ -92,6 +97,9 @@ def setup_scheduler():
     scheduler.add_job(hourly_task, CronTrigger(minute=0, second=0),
                       id='normal_hourly_task', name="每小时定时任务", replace_existing=True)
     
+    scheduler.add_job(sync_all_owners, IntervalTrigger(hours=1),
+                      id='sync_owner_repos', name='同步用户/组织仓库列表', replace_existing=True)
+
     scheduler.add_job(cleanup_orphan_tmp_dirs, IntervalTrigger(hours=1),
                       id='cleanup_tmp_periodic', name='周期清理临时目录', replace_existing=True)
 
@@ -2,17 +2,21 @@ from lib.log import logger
 from lib.db import run_db_session, ListItem, get_all_list_items, update_list_item
 from lib.db.crud.list import promote_status, refresh_item
 from lib.conf import settings
-from lib.utils import get_bj_now, to_bj_aware
-from lib.core.github.remote import check_download
+from lib.utils import get_bj_now, to_bj_aware, gc_blobs
+from lib.core.github.remote import check_download, resume_tmp_dir
+from lib.core.github.prefetch import cleanup_staging
 from lib.schedule.locks import repo_lock
+from lib.schedule.downloads import cancel_download
 import os
 import time
 import glob
+import asyncio
 import shutil
 from typing import Iterable
 
 DOWNLOAD_TIMEOUT_SECONDS = getattr(settings, "download_timeout_seconds", 2000)
 STALE_TMP_GRACE_SECONDS = getattr(settings, "stale_tmp_grace_seconds", 1800)
+RESUME_MAX_AGE_SECONDS = settings.download_resume_max_age_seconds
 
 def _safe_rmtree(path: str) -> None:
     if not os.path.exists(path):
@@ -32,6 +36,13 @@ async def cleanup_orphan_tmp_dirs() -> None:
         return
 
     now = time.time()
+    items = await run_db_session(get_all_list_items)
+    # 仍待下载的版本对应的临时目录里有断点续传清单，保留到 RESUME_MAX_AGE_SECONDS
+    resumable = {
+        os.path.normpath(resume_tmp_dir(item))
+        for item in items
+        if item.enabled and item.status in ("PENDING", "DOWNLOADING")
+    }
 
     removed = 0
     for tmp_dir in glob.iglob(os.path.join(root, "**", "*.tmp-*"), recursive=True):
@@ -39,15 +50,21 @@ async def cleanup_orphan_tmp_dirs() -> None:
             age = now - os.path.getmtime(tmp_dir)
         except FileNotFoundError:
             continue
-        if age > STALE_TMP_GRACE_SECONDS:
+        grace = RESUME_MAX_AGE_SECONDS if os.path.normpath(tmp_dir) in resumable else STALE_TMP_GRACE_SECONDS
+        if age > grace:
             logger.info(f"清理过期临时目录: {tmp_dir} (age={int(age)}s)")
             _safe_rmtree(tmp_dir)
             removed += 1
 
+    removed += cleanup_staging(STALE_TMP_GRACE_SECONDS)
     if removed:
         logger.info(f"本轮共清理临时目录 {removed} 个")
 
-    items = await run_db_session(get_all_list_items)
+    # 去重存储中不再被任何发布文件引用的 blob
+    blobs, freed = await asyncio.to_thread(gc_blobs, settings.blob_gc_grace_seconds)
+    if blobs:
+        logger.info(f"清理未引用的 blob {blobs} 个，释放 {freed} 字节")
+
     for item in items:
         if not item.enabled or item.status != "DOWNLOADING":
             continue
@@ -74,6 +91,16 @@ async def cleanup_orphan_tmp_dirs() -> None:
                     status="PENDING",
                 )
 
+async def reset_interrupted_downloads() -> None:
+    """启动时没有任何下载在跑，遗留的 DOWNLOADING 都是上次进程中断的，直接回退为 PENDING 以便续传。"""
+    items = await run_db_session(get_all_list_items)
+    for item in items:
+        if item.status != "DOWNLOADING":
+            continue
+        ok = await run_db_session(promote_status, item.repository, "DOWNLOADING", "PENDING", start_at=get_bj_now())
+        if ok:
+            logger.warning(f"{item.name} 上次下载被中断，状态回退为 PENDING，将从断点继续")
+
 async def check_and_clean_downloads():
     items = await run_db_session(get_all_list_items)
     now = get_bj_now()  
@@ -91,6 +118,12 @@ async def check_and_clean_downloads():
             if elapsed <= DOWNLOAD_TIMEOUT_SECONDS:
                 continue
 
+            # 本进程里还在下载：真正取消下载任务（保存断点并回退为 PENDING），而不是只改状态
+            moved = await cancel_download(item.repository, "下载超时")
+            if moved is not None:
+                logger.warning(f"{item.name} 下载超时，已取消，本次传输 {moved} 字节，等待从断点重试")
+                continue
+
             lock = repo_lock(item.repository)
             async with lock:
                 fresh = await run_db_session(refresh_item, item.repository)
@@ -1,4 +1,9 @@
+import time
+
+from lib.log import logger
+from lib.db import run_db_session, get_all_list_items
 from lib.core.github.remote import fetch_github_remote_info, prepare_github_download
+from lib.schedule.cadence import poll_queue, compute_poll_interval
 
 async def handle_github_repo():
     await fetch_github_remote_info()
@@ -6,3 +11,28 @@ async def handle_github_repo():
 async def handle_github_download():
     await prepare_github_download()
 
+async def sync_poll_queue():
+    """把数据库中启用/禁用的变化同步进检查队列（新增、重新启用的仓库补排期）。"""
+    items = await run_db_session(get_all_list_items)
+    for item in items:
+        if not item.enabled:
+            poll_queue.discard(item.repository)
+        elif item.repository not in poll_queue:
+            poll_queue.schedule_in(item.repository, compute_poll_interval(item.release_history))
+
+async def run_due_poller():
+    """常驻协程：睡到检查队列队首到期，只检查到期的仓库。"""
+    while True:
+        next_due = poll_queue.next_due()
+        delay = 3600 if next_due is None else next_due - time.time()
+        if delay > 0:
+            await poll_queue.wait(delay)
+            continue
+        repos = poll_queue.pop_due()
+        if not repos:
+            continue
+        logger.info(f"⏰ {len(repos)} 个仓库到期，开始检查")
+        try:
+            await fetch_github_remote_info(repos)
+        except Exception:
+            logger.exception("到期仓库检查失败")
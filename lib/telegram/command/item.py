@@ -1,6 +1,7 @@
 from .registry import register
 from lib.conf import settings
 from lib.db import run_db_session, get_all_list_items, update_list_item, delete_list_item
+from lib.schedule.downloads import cancel_download
 
 @register("item", desc="调整监听的仓库", permission="admin")
 async def item(event, args, client):
@@ -10,6 +11,7 @@ async def item(event, args, client):
     /item enable <repository> - 启用指定仓库的监听
     /item disable <repository> - 禁用指定仓库的监听
     /item delete <repository> - 删除指定仓库的监听
+    /item cancel <repository> - 取消指定仓库正在进行的下载（保留断点，稍后自动重试）
     """
     if not event.is_private:
         await event.respond("此命令只能在私聊中使用。")
@@ -34,6 +36,16 @@ async def item(event, args, client):
             status = "启用" if item.enabled else "禁用"
             message += f"- `{item.repository}` [{status}]\n"
         await event.respond(message)
+    elif action == "cancel":
+        if len(args) != 2:
+            await event.respond("用法错误，请使用 /item cancel <repository>。")
+            return
+        repository = args[1]
+        moved = await cancel_download(repository, "管理员取消")
+        if moved is None:
+            await event.respond(f"仓库 {repository} 当前没有可取消的下载。")
+        else:
+            await event.respond(f"已取消仓库 {repository} 的下载，本次传输 {moved} 字节，断点已保存，稍后自动重试。")
     elif action in ["enable", "disable", "delete"]:
         if len(args) != 2:
             await event.respond(f"用法错误，请使用 /item {action} <repository>。")
@@ -0,0 +1,43 @@
+from .registry import register
+from lib.conf import settings
+from lib.utils import (
+    format_http_stats,
+    format_resilience_stats,
+    format_host_stats,
+    format_signed_url_stats,
+    format_bandwidth_stats,
+    format_mirror_stats,
+    format_download_queue_stats,
+    format_blob_stats,
+)
+from lib.core.github.tokens import format_token_pool
+from lib.schedule.cadence import poll_queue
+from lib.schedule.downloads import download_jobs, queued_downloads
+
+
+@register("stats", desc="查看运行统计", permission="admin")
+async def stats(event, args, client):
+    """
+    查看运行统计
+    /stats - 显示 HTTP 连接池、token 额度等运行指标
+    """
+    tg_id = event.message.sender_id
+    if tg_id != settings.admin_telegram_id:
+        await event.respond("只有管理员才能使用此命令。")
+        return
+
+    message = "运行统计：\n\n"
+    message += f"HTTP 连接池：{format_http_stats()}\n"
+    message += f"GitHub token 额度：{format_token_pool()}\n"
+    message += f"熔断与重试：{format_resilience_stats()}\n"
+    message += f"下载吞吐：{format_host_stats()}\n"
+    message += f"签名直链：{format_signed_url_stats()}\n"
+    message += f"下载带宽：{format_bandwidth_stats()}\n"
+    message += f"下载镜像：{format_mirror_stats()}\n"
+    message += f"下载调度：{format_download_queue_stats()}\n"
+    message += f"去重存储：{format_blob_stats()}\n"
+    upcoming = "，".join(f"{repo}（{secs}s）" for repo, secs in poll_queue.snapshot())
+    running = "，".join(f"{job.repo}（{job.bytes} 字节）" for job in download_jobs())
+    message += f"进行中的下载：{running or '无'}（调度中共 {len(queued_downloads())} 个仓库）\n"
+    message += f"检查队列：{len(poll_queue)} 个仓库，即将检查 {upcoming or '无'}\n"
+    await event.respond(message)
@@ -1,15 +1,48 @@
-from .http_made import get_header, get_header_without_token
-from .tools import get_bj_now, get_download_field, delete_file, check_path_exists, count_files, to_bj_aware
-from .download import download_file_async
+from .http_made import get_header, get_header_without_token, get_api_header
+from .tools import get_bj_now, get_download_field, delete_file, check_path_exists, count_files, to_bj_aware, store_dir, move_legacy_dir
+from .http_client import start_http_client, get_http_session, close_http_client, get_http_stats, format_http_stats
+from .resilience import CircuitOpenError, call_with_retry, format_resilience_stats
+from .host_stats import format_host_stats
+from .signed_url import format_signed_url_stats
+from .bandwidth import throttle_for, format_bandwidth_stats
+from .mirrors import format_mirror_stats
+from .download_queue import format_download_queue_stats
+from .download import download_file_async, drop_manifests, MANIFEST_SUFFIX, DigestMismatchError
+from .blobs import fetch_once, ingest, gc_blobs, format_blob_stats, migrate_legacy_blobs
 
 __all__ = [
     "get_header",
     "get_header_without_token",
+    "get_api_header",
     "get_bj_now",
     "get_download_field",
     "delete_file",
     "check_path_exists",
     "count_files",
     "download_file_async",
+    "drop_manifests",
+    "MANIFEST_SUFFIX",
+    "DigestMismatchError",
     "to_bj_aware",
+    "store_dir",
+    "move_legacy_dir",
+    "start_http_client",
+    "get_http_session",
+    "close_http_client",
+    "get_http_stats",
+    "format_http_stats",
+    "CircuitOpenError",
+    "call_with_retry",
+    "format_resilience_stats",
+    "format_host_stats",
+    "format_signed_url_stats",
+    "throttle_for",
+    "format_bandwidth_stats",
+    "format_mirror_stats",
+    "format_download_queue_stats",
+    "fetch_once",
+    "ingest",
+    "gc_blobs",
+    "format_blob_stats",
+    "migrate_legacy_blobs",
 ]
\ No newline at end of file
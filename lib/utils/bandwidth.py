@@ -0,0 +1,154 @@
+import re
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from lib.conf import settings
+from lib.log import logger
+from lib.utils.tools import get_bj_now
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+# 统计当前速率的滑动窗口（秒）
+_RATE_WINDOW = 5.0
+
+
+def parse_rate(value) -> Optional[float]:
+    """"20M" / "512K" / "1048576" -> 字节每秒；空、0、unlimited 表示不限速。"""
+    if value is None:
+        return None
+    text = str(value).strip().upper().removesuffix("/S").removesuffix("IB").removesuffix("B")
+    if text in ("", "0", "UNLIMITED", "NONE"):
+        return None
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?)", text)
+    if not m:
+        logger.warning(f"无法解析限速值 {value!r}，按不限速处理")
+        return None
+    return float(m.group(1)) * _UNITS[m.group(2)] or None
+
+
+def _minutes(hhmm: str) -> int:
+    hour, minute = hhmm.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def parse_schedule(text: Optional[str]) -> List[tuple]:
+    """"01:00-06:00=0,09:00-18:00=10M" -> [(开始分钟, 结束分钟, 速率)]，结束早于开始表示跨零点。"""
+    windows = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            span, rate = part.split("=", 1)
+            start, end = span.split("-", 1)
+            windows.append((_minutes(start.strip()), _minutes(end.strip()), rate.strip()))
+        except ValueError:
+            logger.warning(f"无法解析限速时段 {part!r}，已忽略")
+    return windows
+
+
+def current_rate(limit, schedule: Optional[str]) -> Optional[float]:
+    """按北京时间取当前生效的限速：命中第一个时段用时段的值，否则用 limit。"""
+    now = get_bj_now()
+    minute = now.hour * 60 + now.minute
+    for start, end, rate in parse_schedule(schedule):
+        inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+        if inside:
+            return parse_rate(rate)
+    return parse_rate(limit)
+
+
+class TokenBucket:
+    """
+    令牌桶限速器：容量为 1 秒的流量，速率每次取令牌时按时段重新计算。
+    取令牌在一把 FIFO 锁内排队并在锁内等待欠额，各分段按到达顺序轮流放行，互相之间公平。
+    """
+
+    def __init__(self, name: str, limit, schedule: Optional[str] = None):
+        self.name = name
+        self.limit = limit
+        self.schedule = schedule
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._recent: deque = deque()
+        self._recent_bytes = 0
+
+    def rate(self) -> Optional[float]:
+        return current_rate(self.limit, self.schedule)
+
+    def _account(self, n: int) -> None:
+        now = time.monotonic()
+        self._recent.append((now, n))
+        self._recent_bytes += n
+        while self._recent and now - self._recent[0][0] > _RATE_WINDOW:
+            self._recent_bytes -= self._recent.popleft()[1]
+
+    def throughput(self) -> float:
+        self._account(0)
+        return self._recent_bytes / _RATE_WINDOW
+
+    async def consume(self, n: int) -> None:
+        self._account(n)
+        rate = self.rate()
+        if not rate:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(rate, self.tokens + (now - self.updated) * rate) - n
+            self.updated = now
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / rate)
+
+
+class Throttle:
+    """一次下载经过的所有限速器（全局 + 可选的仓库级），每收到一块数据依次取令牌。"""
+
+    def __init__(self, buckets: Sequence[TokenBucket]):
+        self.buckets = list(buckets)
+        # 经过本限速器的累计字节数，用于统计一次仓库下载的传输量
+        self.bytes = 0
+
+    async def consume(self, n: int) -> None:
+        self.bytes += n
+        for bucket in self.buckets:
+            await bucket.consume(n)
+
+
+global_bucket = TokenBucket("全局", settings.download_rate_limit, settings.download_rate_schedule)
+_repo_buckets: Dict[str, TokenBucket] = {}
+
+
+def throttle_for(repo: Optional[str] = None, options: Optional[dict] = None) -> Throttle:
+    """仓库 config 中设置了 rate_limit / rate_schedule 时叠加一个该仓库专用的令牌桶。"""
+    options = options or {}
+    if not repo or not (options.get("rate_limit") or options.get("rate_schedule")):
+        return Throttle([global_bucket])
+    bucket = _repo_buckets.get(repo)
+    if bucket is None:
+        bucket = _repo_buckets[repo] = TokenBucket(repo, None)
+    # 配置可能被热更新，每次都同步一下
+    bucket.limit, bucket.schedule = options.get("rate_limit"), options.get("rate_schedule")
+    return Throttle([global_bucket, bucket])
+
+
+def _fmt(rate: Optional[float]) -> str:
+    if not rate:
+        return "不限"
+    for unit in ("B", "KiB", "MiB"):
+        if rate < 1024:
+            return f"{rate:.1f}{unit}/s"
+        rate /= 1024
+    return f"{rate:.1f}GiB/s"
+
+
+def format_bandwidth_stats() -> str:
+    parts = []
+    for bucket in [global_bucket, *_repo_buckets.values()]:
+        used, rate = bucket.throughput(), bucket.rate()
+        if bucket is not global_bucket and not used:
+            continue
+        usage = f"（{used / rate:.0%}）" if rate else ""
+        parts.append(f"{bucket.name} 限速 {_fmt(rate)}，当前 {_fmt(used) if used else '0'}{usage}")
+    return "；".join(parts)
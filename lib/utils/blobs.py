@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from lib.conf import settings
+from lib.log import logger
+from lib.utils.download import MANIFEST_SUFFIX
+from lib.utils.tools import store_dir, move_legacy_dir
+
+# sha256 -> 正在下载该内容的任务结束时完成的 future，相同内容只下载一次
+_inflight: Dict[str, asyncio.Future] = {}
+_stats = {"linked": 0, "merged": 0}
+
+
+def sha256_hex(digest: Optional[str]) -> Optional[str]:
+    if digest and digest.lower().startswith("sha256:"):
+        return digest.split(":", 1)[1].lower()
+    return None
+
+
+def blob_root() -> str:
+    return store_dir("blobs", "sha256")
+
+
+def migrate_legacy_blobs() -> None:
+    """把 download_root_path/.gda-blobs 移到 store_dir("blobs")。"""
+    move_legacy_dir(os.path.join(settings.download_root_path, ".gda-blobs"), store_dir("blobs"))
+
+
+def blob_path(sha: str) -> str:
+    return os.path.join(blob_root(), sha[:2], sha)
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _relink(src: str, target: str) -> None:
+    """原子地把 target 换成 src 的硬链接。"""
+    tmp = target + ".gda-link"
+    try:
+        os.remove(tmp)
+    except FileNotFoundError:
+        pass
+    os.link(src, tmp)
+    os.replace(tmp, target)
+
+
+def link_blob(sha: Optional[str], target: str, size: Optional[int] = None) -> bool:
+    """库中已有该内容时把 target 做成它的硬链接并返回 True。"""
+    if not settings.blob_store_enabled or not sha:
+        return False
+    blob = blob_path(sha)
+    try:
+        if size is not None and os.stat(blob).st_size != size:
+            return False
+        if not (os.path.exists(target) and os.path.samefile(blob, target)):
+            _relink(blob, target)
+            _stats["linked"] += 1
+    except OSError:
+        return False
+    # 旧的续传清单作废，避免之后续传写进共享的 blob
+    try:
+        os.remove(target + MANIFEST_SUFFIX)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def store_blob(path: str, sha: str) -> None:
+    """把已校验的文件收进库：库中没有时硬链接进去，已有同样内容时把 path 换成库里那份。"""
+    if not settings.blob_store_enabled:
+        return
+    blob = blob_path(sha)
+    try:
+        if os.path.exists(blob):
+            if os.path.samefile(blob, path):
+                return
+            if os.path.getsize(blob) == os.path.getsize(path):
+                _relink(blob, path)
+                _stats["linked"] += 1
+            else:
+                # 库里那份被截断或改动过（例如有人直接改了发布文件），换成刚校验过的文件
+                logger.warning(f"blob {sha} 大小不符，已用新下载的文件替换")
+                _relink(path, blob)
+            return
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.link(path, blob)
+    except FileExistsError:
+        # 并发收录同一内容时以先到的为准
+        store_blob(path, sha)
+    except OSError as e:
+        # 例如跨文件系统无法硬链接：保留普通文件，只是不去重
+        logger.warning(f"收录 {path} 到去重存储失败：{e}")
+
+
+async def ingest(path: str, digest: Optional[str] = None) -> None:
+    """发布前收录一个文件；没有上游摘要时自己计算 sha256。"""
+    if not settings.blob_store_enabled or not os.path.isfile(path):
+        return
+    sha = sha256_hex(digest) or await asyncio.to_thread(sha256_file, path)
+    store_blob(path, sha)
+
+
+async def fetch_once(
+    digest: Optional[str],
+    target: str,
+    size: Optional[int],
+    fetch: Callable[[], Awaitable[None]],
+) -> None:
+    """
+    按 sha256 去重下载：库中已有时直接硬链接；其他仓库正在下载同一内容时等它完成后链接，
+    它失败了再自己下载。下载成功的文件立即收进库，后来者都能直接复用。
+    """
+    sha = sha256_hex(digest) if settings.blob_store_enabled else None
+    if not sha:
+        await fetch()
+        return
+    while not link_blob(sha, target, size):
+        running = _inflight.get(sha)
+        if running is None:
+            break
+        _stats["merged"] += 1
+        # 不能直接 await：等待方被取消时不能把下载方的 future 一起取消
+        await asyncio.wait([running])
+    else:
+        return
+
+    done = _inflight[sha] = asyncio.get_running_loop().create_future()
+    try:
+        await fetch()
+        store_blob(target, sha)
+    finally:
+        del _inflight[sha]
+        done.set_result(None)
+
+
+def gc_blobs(grace_seconds: float) -> Tuple[int, int]:
+    """删除没有任何发布文件引用（硬链接数为 1）且超过宽限期的 blob，返回 (个数, 字节数)。"""
+    root = blob_root()
+    if not os.path.isdir(root):
+        return 0, 0
+    now = time.time()
+    removed = freed = 0
+    for base, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(base, name)
+            try:
+                st = os.stat(path)
+                # 链接数变化会更新 ctime，刚被取消引用或刚收录的 blob 先留着
+                if st.st_nlink > 1 or now - st.st_ctime < grace_seconds:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            freed += st.st_size
+    return removed, freed
+
+
+def format_blob_stats() -> str:
+    if not settings.blob_store_enabled:
+        return "未启用"
+    count = total = saved = 0
+    for base, _, files in os.walk(blob_root()):
+        for name in files:
+            try:
+                st = os.stat(os.path.join(base, name))
+            except OSError:
+                continue
+            count += 1
+            total += st.st_size
+            # 库里一份 + N 个发布文件，原本需要 N 份
+            saved += st.st_size * max(0, st.st_nlink - 2)
+    return (
+        f"{count} 个 blob 共 {total} 字节，去重节省 {saved} 字节，"
+        f"复用链接 {_stats['linked']} 次，合并下载 {_stats['merged']} 次"
+    )
@@ -1,47 +1,256 @@
-import os, math, asyncio, aiohttp, aiofiles, sys
-from typing import Optional, Tuple
+import os, math, json, time, asyncio, aiohttp, sys, hashlib
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
 from tqdm.auto import tqdm
 from lib.conf import settings
-from lib.utils import get_header
-
-def _part_path(filename: str, idx: int) -> str:
-    return f"{filename}.part{idx}"
-
-async def _merge_parts(filename: str, num_parts: int) -> None:
-    async with aiofiles.open(filename, "wb") as out_f:
-        for i in range(num_parts):
-            part_file = _part_path(filename, i)
-            async with aiofiles.open(part_file, "rb") as in_f:
-                while True:
-                    chunk = await in_f.read(1024 * 64)
-                    if not chunk:
-                        break
-                    await out_f.write(chunk)
-            try:
-                os.remove(part_file)
-            except FileNotFoundError:
-                pass
+from lib.log import logger
+from lib.utils import get_header, get_header_without_token
+from lib.utils.http_client import get_http_session
+from lib.utils.resilience import CircuitOpenError, call_with_retry, get_breaker, host_of
+from lib.utils.host_stats import host_stats
+from lib.utils.signed_url import ResolvedURL
+from lib.utils.bandwidth import Throttle, throttle_for
+from lib.utils.mirrors import SourceMismatchError, drop_mirror, mirror_urls
+from lib.utils.download_queue import connection_slot, size_priority
+
+def _base_headers(url: str) -> dict:
+    """只对 GitHub 的下载地址携带 token，通用 HTTP 源不泄露凭据。"""
+    host = (urlsplit(url).hostname or "").lower()
+    if host == "github.com" or host.endswith(".github.com"):
+        return get_header(settings.github_token)
+    headers = get_header_without_token()
+    headers["Accept-Encoding"] = "identity"
+    return headers
+
+T = TypeVar("T")
+
+MANIFEST_SUFFIX = ".gda-manifest"
+# 断点续传清单最多每隔多少秒落盘一次
+_MANIFEST_SAVE_INTERVAL = 1.0
+
+class _Segment:
+    """
+    一个字节区间 [start, end]：pos 之前的数据已写入磁盘，cursor 之前的数据已收到。
+    end 可以被空闲 worker 缩短（拆走尾部），正在下载的流读到新的 end 就停止。
+    """
+
+    __slots__ = ("start", "end", "pos", "cursor", "started_at", "started_cursor")
+
+    def __init__(self, start: int, end: Optional[int], pos: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.pos = start if pos is None else pos
+        self.cursor = self.pos
+        self.started_at = None
+        self.started_cursor = self.pos
+
+    @property
+    def remaining(self) -> int:
+        return 0 if self.end is None else max(0, self.end + 1 - self.cursor)
+
+    def eta(self) -> float:
+        """按本段当前速率估算剩余秒数；还没有数据时视为无穷大。"""
+        received = self.cursor - self.started_cursor
+        if self.started_at is None or received <= 0:
+            return float("inf")
+        rate = received / max(time.monotonic() - self.started_at, 1e-3)
+        return self.remaining / rate
 
-async def _resolve_total_and_range(session: aiohttp.ClientSession, url: str, base_headers: dict) -> Tuple[Optional[int], bool]:
+    @property
+    def done(self) -> bool:
+        return self.end is not None and self.pos > self.end
+
+    def to_list(self) -> list:
+        return [self.start, self.end, self.pos]
+
+
+class DigestMismatchError(Exception):
+    """下载完成的文件与上游提供的摘要不一致（文件已删除，重新下载即可）。"""
+
+
+class _OrderedHasher:
+    """
+    边下载边计算 SHA-256：按偏移顺序写出的数据直接送入哈希，不再读盘；
+    乱序到达的分段等前面的数据都落盘后，从页缓存读回补齐，单连接下载全程零回读。
+    """
+
+    _READ_BYTES = 1024 * 1024
+
+    def __init__(self, fd: int, segments: Callable[[], List["_Segment"]]):
+        self._fd = fd
+        self._segments = segments
+        self._sha = hashlib.sha256()
+        self.pos = 0
+        self.read_back = 0
+
+    def feed(self, offset: int, data: bytes) -> None:
+        if offset <= self.pos < offset + len(data):
+            self._sha.update(memoryview(data)[self.pos - offset:])
+            self.pos = offset + len(data)
+
+    def _flushed_until(self) -> int:
+        """从 pos 开始连续落盘到哪里（各分段 [start, pos) 已写入）。"""
+        frontier = self.pos
+        for seg in sorted(self._segments(), key=lambda seg: seg.start):
+            if seg.start <= frontier < seg.pos:
+                frontier = seg.pos
+        return frontier
+
+    def catch_up(self, limit: Optional[int] = None) -> None:
+        limit = self._flushed_until() if limit is None else limit
+        while self.pos < limit:
+            data = os.pread(self._fd, min(self._READ_BYTES, limit - self.pos), self.pos)
+            if not data:
+                break
+            self._sha.update(data)
+            self.pos += len(data)
+            self.read_back += len(data)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+class _PositionalWriter:
+    """
+    每个文件一个写协程 + 有界队列：各分段把连续数据攒成大块后按偏移 pwrite 到预分配的目标文件，
+    每次线程切换写出队列里积压的全部块，不再有 .partN 与合并阶段。
+    写完一批后推进对应分段的 pos，并通知 on_flushed（用于保存断点续传清单）。
+    给了 hasher 时在同一个线程里顺带计算摘要。
+    """
+
+    def __init__(
+        self,
+        fd: int,
+        max_pending: int = 16,
+        on_flushed: Optional[Callable[[], None]] = None,
+        hasher: Optional[_OrderedHasher] = None,
+    ):
+        self._fd = fd
+        self._hasher = hasher
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._error: Optional[BaseException] = None
+        self._on_flushed = on_flushed
+        self._task = asyncio.create_task(self._run())
+
+    async def write(self, offset: int, data: bytes, segment: Optional[_Segment] = None) -> None:
+        if self._error is not None:
+            raise self._error
+        await self._queue.put((offset, data, segment))
+
+    def _flush(self, batch: List[Tuple[int, bytes, Optional[_Segment]]]) -> None:
+        for offset, data, _ in batch:
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+            if self._hasher is not None:
+                self._hasher.feed(offset - len(data), data)
+        if self._hasher is not None:
+            self._hasher.catch_up()
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            batch, stop = [], item is None
+            if item is not None:
+                batch.append(item)
+            while not stop and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch and self._error is None:
+                try:
+                    await asyncio.to_thread(self._flush, batch)
+                    for offset, data, segment in batch:
+                        if segment is not None:
+                            segment.pos = max(segment.pos, offset + len(data))
+                    if self._on_flushed is not None:
+                        self._on_flushed()
+                except Exception as e:
+                    # 出错后继续消费队列，避免生产者卡在 put() 上
+                    self._error = e
+            if stop:
+                return
+
+    async def close(self) -> None:
+        """写完队列中剩余的数据后结束；可重复调用。"""
+        if not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        if self._error is not None:
+            raise self._error
+
+
+def _sha256_of(digest: Optional[str]) -> Optional[str]:
+    """上游摘要 "sha256:<hex>" -> 小写十六进制；其他算法不校验。"""
+    if not digest or ":" not in digest:
+        return None
+    algo, value = digest.split(":", 1)
+    return value.lower() if algo.lower() == "sha256" else None
+
+def _preallocate(fd: int, size: int) -> None:
+    if size <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # 文件系统不支持时退化为稀疏文件
+        os.ftruncate(fd, size)
+
+def _load_manifest(fullpath: str, size: Optional[int], validator: Optional[str]) -> Optional[dict]:
+    """读取断点续传清单；大小或 ETag/Last-Modified 与本次探测不一致时视为无效。"""
+    try:
+        with open(fullpath + MANIFEST_SUFFIX, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if size is None or manifest.get("size") != size or manifest.get("validator") != validator:
+        return None
+    try:
+        if os.path.getsize(fullpath) != size:
+            return None
+    except OSError:
+        return None
+    return manifest
+
+def drop_manifests(path: str) -> None:
+    """发布前删除目录中的断点续传清单。"""
+    for name in os.listdir(path):
+        if name.endswith(MANIFEST_SUFFIX) or name.endswith(MANIFEST_SUFFIX + ".tmp"):
+            os.remove(os.path.join(path, name))
+
+def _save_manifest(fullpath: str, manifest: dict) -> None:
+    path = fullpath + MANIFEST_SUFFIX
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+async def _resolve_total_and_range(session: aiohttp.ClientSession, url: str, base_headers: dict, **req_kwargs) -> Tuple[Optional[int], bool, Optional[str]]:
     """
     优先 HEAD -> 拿不到再用 Range GET(0-0) 解析 Content-Range。
-    返回: (total_size, supports_range)
+    返回: (total_size, supports_range, validator)，validator 取 ETag，没有则取 Last-Modified。
     """
     try:
-        async with session.head(url, allow_redirects=True, headers=base_headers) as resp:
+        async with session.head(url, allow_redirects=True, headers=base_headers, **req_kwargs) as resp:
             if resp.status == 200:
                 cl = resp.headers.get("Content-Length")
                 total = int(cl) if cl and cl.isdigit() else None
                 supports_range = "bytes" in resp.headers.get("Accept-Ranges", "").lower()
+                validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
                 if total is not None:
-                    return total, supports_range
+                    return total, supports_range, validator
     except Exception:
         pass
 
     headers = dict(base_headers)
     headers["Range"] = "bytes=0-0"
     try:
-        async with session.get(url, headers=headers, allow_redirects=True) as resp:
+        async with session.get(url, headers=headers, allow_redirects=True, **req_kwargs) as resp:
             if resp.status in (200, 206):
                 cr = resp.headers.get("Content-Range")  # e.g. "bytes 0-0/12345"
                 total = None
@@ -50,62 +259,172 @@ async def _resolve_total_and_range(session: aiohttp.ClientSession, url: str, bas
                         total = int(cr.split("/")[-1])
                     except ValueError:
                         total = None
-                return total, True  # 能走到这里基本说明支持 Range
+                validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+                return total, True, validator  # 能走到这里基本说明支持 Range
     except Exception:
         pass
 
-    return None, False
+    return None, False, None
+
+def _content_range_total(headers) -> Optional[int]:
+    cr = headers.get("Content-Range")  # e.g. "bytes 0-0/12345"
+    try:
+        return int(cr.split("/")[-1]) if cr and "/" in cr else None
+    except ValueError:
+        return None
+
+async def _race_sources(
+    session: aiohttp.ClientSession,
+    sources: List[ResolvedURL],
+    total_size: int,
+    req_kwargs: dict,
+    priority: float,
+) -> List[ResolvedURL]:
+    """
+    同时向各来源请求开头 mirror_probe_bytes 字节，探测连接与分段一样占用连接槽位；
+    第一个成功的来源胜出，仍在探测的来源随即取消并关闭连接，排在已完成的来源之后。
+    超时、出错、不支持 Range 或总大小与预期不符的来源被剔除。
+    """
+    probe = max(1, min(settings.mirror_probe_bytes, total_size))
+
+    async def _probe(source: ResolvedURL) -> None:
+        if get_breaker(source.url).is_open():
+            raise CircuitOpenError(f"{get_breaker(source.url).host} 熔断中")
+        headers = _base_headers(source.url)
+        headers["Range"] = f"bytes=0-{probe - 1}"
+        async with connection_slot(host_of(source.url), priority):
+            async with asyncio.timeout(settings.mirror_race_timeout):
+                async with session.get(source.url, headers=headers, **req_kwargs) as resp:
+                    if resp.status != 206:
+                        raise aiohttp.ClientResponseError(
+                            request_info=resp.request_info,
+                            history=resp.history,
+                            status=resp.status,
+                            message="Range not supported",
+                            headers=resp.headers,
+                        )
+                    total = _content_range_total(resp.headers)
+                    if total is not None and total != total_size:
+                        raise SourceMismatchError(f"文件大小为 {total}，预期 {total_size}")
+                    await resp.read()
+
+    tasks = {asyncio.create_task(_probe(source)): source for source in sources}
+    ranked: List[ResolvedURL] = []
+    pending = set(tasks)
+    try:
+        while pending and not ranked:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (t for t in tasks if t in done):
+                source, error = tasks[task], task.exception()
+                if error is None:
+                    ranked.append(source)
+                    continue
+                logger.info(f"下载来源 {source.origin} 竞速失败：{type(error).__name__} {error}")
+                if isinstance(error, SourceMismatchError):
+                    drop_mirror(source.mirror, str(error))
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    # 落后的来源没跑完探测，按原顺序作为备用；大小不符时分段请求会再把它剔除
+    return ranked + [source for task, source in tasks.items() if task in pending]
+
+async def _call_source(source: ResolvedURL, func: Callable[[str], Awaitable[T]], attempts: Optional[int] = None) -> T:
+    """按当前直链请求；签名直链返回 403/410 时重新解析跳转，再用新直链重试一轮。"""
+    url = source.url
+    try:
+        return await call_with_retry(url, lambda: func(url), attempts)
+    except aiohttp.ClientResponseError as e:
+        if e.status not in (403, 410) or not await source.refresh(url, e.status):
+            raise
+    url = source.url
+    return await call_with_retry(url, lambda: func(url), attempts)
 
 async def __download_chunk_async(
     session: aiohttp.ClientSession,
-    url: str,
-    start: int,
-    end: int,
-    filename: str,
+    source: ResolvedURL,
+    segment: _Segment,
+    writer: _PositionalWriter,
     progress: Optional[tqdm],
     progress_lock: asyncio.Lock,
-    base_headers: dict,
     chunk_bytes: int = 1024 * 64,
+    buffer_bytes: int = 1024 * 1024,
     max_retries: int = 3,
-    retry_backoff: float = 0.8,
+    req_kwargs: Optional[dict] = None,
+    throttle: Optional[Throttle] = None,
+    expected_total: Optional[int] = None,
 ) -> None:
-    headers = dict(base_headers)
-    headers["Range"] = f"bytes={start}-{end}"
+    async def _fetch(url: str) -> None:
+        # 重试时从已收到的位置继续，而不是从分段开头重下
+        start, end = segment.cursor, segment.end
+        if start > end:
+            return
+        headers = _base_headers(url)
+        headers["Range"] = f"bytes={start}-{end}"
+        async with session.get(url, headers=headers, **(req_kwargs or {})) as resp:
+            # 服务器忽略 Range 返回 200 时，只有从 0 开始的分段能直接使用
+            if resp.status != 206 and not (resp.status == 200 and start == 0):
+                raise aiohttp.ClientResponseError(
+                    request_info=resp.request_info,
+                    history=resp.history,
+                    status=resp.status,
+                    message=f"Unexpected status {resp.status} for range {start}-{end}",
+                    headers=resp.headers,
+                )
+            total = _content_range_total(resp.headers)
+            if resp.status == 206 and expected_total is not None and total not in (None, expected_total):
+                raise SourceMismatchError(f"{url} 的文件大小为 {total}，预期 {expected_total}")
+            await _stream_to(resp, writer, segment, progress, progress_lock, chunk_bytes, buffer_bytes, throttle)
 
-    # 确保分片文件存在
-    if not os.path.exists(filename):
-        open(filename, "wb").close()
+    # 重试受目标主机熔断器与全局重试预算约束，退避带随机抖动
+    await _call_source(source, _fetch, attempts=max_retries + 1)
 
-    attempt = 0
-    while True:
-        try:
-            async with session.get(url, headers=headers) as resp:
-                if resp.status not in (200, 206):
-                    raise aiohttp.ClientResponseError(
-                        request_info=resp.request_info,
-                        history=resp.history,
-                        status=resp.status,
-                        message=f"Unexpected status {resp.status} for range {start}-{end}",
-                        headers=resp.headers,
-                    )
-
-                async with aiofiles.open(filename, "r+b") as fp:
-                    await fp.seek(0)
-                    async for chunk in resp.content.iter_chunked(chunk_bytes):
-                        if not chunk:
-                            continue
-                        await fp.write(chunk)
-                        if progress is not None:
-                            # 在异步下，update 后最好 refresh 一下
-                            async with progress_lock:
-                                progress.update(len(chunk))
-                                progress.refresh()
+async def _stream_to(
+    resp: aiohttp.ClientResponse,
+    writer: _PositionalWriter,
+    segment: _Segment,
+    progress: Optional[tqdm],
+    progress_lock: asyncio.Lock,
+    chunk_bytes: int,
+    buffer_bytes: int,
+    throttle: Optional[Throttle] = None,
+) -> None:
+    """把响应体攒成 buffer_bytes 大小的块交给写协程，写到分段末尾（可能被缩短）为止；给了 throttle 时按块限速。"""
+    buf = bytearray()
+    buf_start = segment.cursor
+
+    async def _flush() -> None:
+        nonlocal buf_start
+        if not buf:
+            return
+        data = bytes(buf)
+        buf.clear()
+        offset, buf_start = buf_start, buf_start + len(data)
+        await writer.write(offset, data, segment)
+        if progress is not None:
+            async with progress_lock:
+                progress.update(len(data))
+                progress.refresh()
+
+    try:
+        async for chunk in resp.content.iter_chunked(chunk_bytes):
+            if not chunk:
+                continue
+            if segment.end is not None:
+                chunk = chunk[:max(0, segment.end + 1 - segment.cursor)]
+            buf += chunk
+            segment.cursor += len(chunk)
+            if throttle is not None:
+                await throttle.consume(len(chunk))
+            if len(buf) >= buffer_bytes:
+                await _flush()
+            if segment.end is not None and segment.cursor > segment.end:
                 break
-        except (aiohttp.ClientError, asyncio.TimeoutError):
-            attempt += 1
-            if attempt > max_retries:
-                raise
-            await asyncio.sleep(retry_backoff * (2 ** (attempt - 1)))
+    except (aiohttp.ClientError, asyncio.TimeoutError, asyncio.CancelledError):
+        # 中断或被取消前收到的数据仍然有效，写出后重试 / 续传从断点继续
+        await _flush()
+        raise
+    await _flush()
 
 async def download_file_async(
     url: str,
@@ -113,109 +432,279 @@ async def download_file_async(
     path: str,
     num_threads: int = 5,
     *,
+    size: Optional[int] = None,
+    validator: Optional[str] = None,
+    digest: Optional[str] = None,
+    throttle: Optional[Throttle] = None,
     timeout_s: int = 60,
     chunk_bytes: int = 1024 * 64,
+    buffer_bytes: int = 1024 * 1024,
 ) -> bool:
+    """
+    下载到 path/filename。大小已知且支持 Range 时在旁边维护 <filename>.gda-manifest：
+    失败或进程重启后再次调用只补下缺失的字节；下载完成后清单标记 complete，再次调用直接跳过。
+    分段数按主机历史吞吐自动决定（num_threads 只是没有历史时的默认值），先完成的连接会拆分最慢分段的剩余部分。
+    调用方已知大小（release API 的 asset size）时传入 size / validator，直接按 Range 分段，不再发探测请求；
+    服务器实际不支持 Range 时由分段请求的 200 响应降级为单流。
+    所有下载都经过全局限速器，throttle 可额外叠加仓库级限速（见 bandwidth.throttle_for）；
+    每个连接都要先拿到全局与单主机的连接槽位（见 download_queue），小文件优先。
+    给了上游摘要 digest（"sha256:<hex>"）时边下载边校验，不一致则删除该文件并抛出 DigestMismatchError。
+    """
     fullpath = os.path.join(path, filename)
     os.makedirs(path, exist_ok=True)
+    throttle = throttle or throttle_for()
 
-    base_headers = get_header(settings.github_token)
+    base_headers = _base_headers(url)
     timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout_s, sock_read=timeout_s)
-    connector = aiohttp.TCPConnector(ssl=False)  # 若需严格校验证书改 True
-
-    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-        total_size, supports_range = await _resolve_total_and_range(session, url, base_headers)
-
-        # 建立进度条（total 可能为 None，先给 0；拿到后动态 reset）
-        progress = tqdm(
-            total=total_size or 0,
-            unit="B",
-            unit_scale=True,
-            unit_divisor=1024,
-            desc=fullpath,
-            dynamic_ncols=True,
-            leave=True,
-            disable=not sys.stdout.isatty(),  # 若非 TTY，自动禁用
-        )
-        progress_lock = asyncio.Lock()
+    # 复用进程级连接池；ssl=False 沿用原行为（若需严格校验证书去掉即可）
+    req_kwargs = {"timeout": timeout, "ssl": False}
 
+    session = get_http_session()
+    mirrors = [
+        ResolvedURL(mirror_url, session, _base_headers(mirror_url), req_kwargs, mirror=template)
+        for template, mirror_url in mirror_urls(url)
+    ]
+    # 主机熔断中时连探测请求也不发（配置了镜像时仍可只从镜像下载）
+    if get_breaker(url).is_open() and not mirrors:
+        raise CircuitOpenError(f"{get_breaker(url).host} 熔断中，跳过下载 {filename}")
+
+    # GitHub 下载地址先解析一次跳转，之后的探测、分段与重试都直接请求存储主机（不携带 token）
+    source = ResolvedURL(url, session, base_headers, req_kwargs)
+    try:
+        await source.resolve()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        if not mirrors:
+            raise
+        logger.warning(f"解析 {url} 失败，只从镜像下载：{e}")
+        source = mirrors.pop(0)
+    base_headers = _base_headers(source.url)
+    if size is not None:
+        total_size, supports_range = size, True
+    else:
+        total_size, supports_range, validator = await _resolve_total_and_range(session, source.url, base_headers, **req_kwargs)
+
+    # 支持分片：如果 total 仍未知，先用一个最小 Range 再探测
+    if supports_range and total_size is None:
+        probe_headers = dict(base_headers)
+        probe_headers["Range"] = "bytes=0-0"
+        try:
+            async with session.get(source.url, headers=probe_headers, **req_kwargs) as resp:
+                total_size = _content_range_total(resp.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+    expected_sha = _sha256_of(digest)
+    manifest = _load_manifest(fullpath, total_size, validator)
+    if manifest and manifest.get("complete") and (not expected_sha or manifest.get("sha256") == expected_sha):
+        return True
+    if manifest and manifest.get("complete"):
+        manifest = None
+    # 拿不到总大小时无法分片也无法续传，降级为单流
+    resumable = supports_range and total_size is not None
+
+    # 建立进度条（total 可能为 None，先给 0；拿到后动态 reset）
+    progress = tqdm(
+        total=total_size or 0,
+        unit="B",
+        unit_scale=True,
+        unit_divisor=1024,
+        desc=fullpath,
+        dynamic_ncols=True,
+        leave=True,
+        disable=not sys.stdout.isatty(),  # 若非 TTY，自动禁用
+    )
+    progress_lock = asyncio.Lock()
+
+    segments: List[_Segment] = []
+    if resumable and manifest:
+        segments = [_Segment(*seg) for seg in manifest.get("segments") or []]
+        fd = os.open(fullpath, os.O_RDWR)
+    else:
+        # 已有文件可能是已发布文件或去重存储的硬链接，先解除链接再新建，不能就地截断
         try:
-            if not supports_range:
-                # 单流下载（Fallback）
-                async with session.get(url, headers=base_headers) as resp:
+            os.remove(fullpath)
+        except FileNotFoundError:
+            pass
+        fd = os.open(fullpath, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    last_saved = 0.0
+    completed = False
+
+    def _checkpoint(force: bool = False) -> None:
+        nonlocal last_saved
+        if not resumable or (not force and time.monotonic() - last_saved < _MANIFEST_SAVE_INTERVAL):
+            return
+        _save_manifest(fullpath, {
+            "size": total_size,
+            "validator": validator,
+            "complete": False,
+            "segments": [seg.to_list() for seg in segments],
+        })
+        last_saved = time.monotonic()
+
+    # 连接按文件大小排队，小文件先拿到连接
+    priority = size_priority(total_size)
+    hasher = _OrderedHasher(fd, lambda: segments) if expected_sha else None
+    writer = _PositionalWriter(fd, on_flushed=_checkpoint, hasher=hasher)
+    discard = False
+    served_by: set = set()
+    tasks: List[asyncio.Task] = []
+    try:
+        async def _single_stream(url: str) -> None:
+            # 不支持 Range 时每次重试都只能从头开始
+            whole = _Segment(0, total_size - 1 if total_size is not None else None)
+            async with connection_slot(host_of(url), priority):
+                async with session.get(url, headers=base_headers, **req_kwargs) as resp:
                     resp.raise_for_status()
                     # 尝试从响应里再取一次总大小（有些服务此时给 Content-Length）
-                    if total_size is None:
-                        cl = resp.headers.get("Content-Length")
-                        if cl and cl.isdigit():
-                            total_size = int(cl)
-                            progress.reset(total=total_size)
-                            progress.refresh()
-
-                    async with aiofiles.open(fullpath, "wb") as fp:
-                        async for chunk in resp.content.iter_chunked(chunk_bytes):
-                            if not chunk:
-                                continue
-                            await fp.write(chunk)
-                            async with progress_lock:
-                                progress.update(len(chunk))
-                                progress.refresh()
-                return True
-
-            # 支持分片：如果 total 仍未知，先用一个最小 Range 再探测
-            if total_size is None:
-                probe_headers = dict(base_headers)
-                probe_headers["Range"] = "bytes=0-0"
-                async with session.get(url, headers=probe_headers) as resp:
-                    cr = resp.headers.get("Content-Range")
-                    if cr and "/" in cr:
-                        try:
-                            total_size = int(cr.split("/")[-1])
-                            progress.reset(total=total_size)
-                            progress.refresh()
-                        except ValueError:
-                            pass
-
-            # 分片调度
-            if total_size is None:
-                # 保险兜底：如果还拿不到总大小，就降级为单流
-                async with session.get(url, headers=base_headers) as resp:
-                    resp.raise_for_status()
-                    async with aiofiles.open(fullpath, "wb") as fp:
-                        async for chunk in resp.content.iter_chunked(chunk_bytes):
-                            if not chunk:
-                                continue
-                            await fp.write(chunk)
-                            async with progress_lock:
-                                progress.update(len(chunk))
-                                progress.refresh()
-                return True
-
-            part_size = math.ceil(total_size / num_threads)
-            tasks = []
-            for i in range(num_threads):
-                start = i * part_size
-                end = min(start + part_size - 1, total_size - 1)
-                part_file = _part_path(fullpath, i)
-                if not os.path.exists(part_file):
-                    open(part_file, "wb").close()
-
-                tasks.append(
-                    __download_chunk_async(
-                        session=session,
-                        url=url,
-                        start=start,
-                        end=end,
-                        filename=part_file,
-                        progress=progress,
-                        progress_lock=progress_lock,
-                        base_headers=base_headers,
-                        chunk_bytes=chunk_bytes,
-                    )
-                )
+                    cl = resp.headers.get("Content-Length")
+                    if cl and cl.isdigit():
+                        progress.reset(total=int(cl))
+                        progress.refresh()
+                    await _stream_to(resp, writer, whole, progress, progress_lock, chunk_bytes, buffer_bytes, throttle)
+
+        if not resumable:
+            await _call_source(source, _single_stream)
+        else:
+            sources = [source]
+            if mirrors:
+                # 源站与镜像竞速首包，分段按快慢轮流分给仍然健康的来源
+                sources = await _race_sources(session, [source, *mirrors], total_size, req_kwargs, priority) or [source]
+                logger.info(f"{filename} 下载来源（按速度）：{', '.join(host_of(s.url) for s in sources)}")
+            host = host_of(sources[0].url)
+            workers = host_stats.plan(host, total_size, num_threads)
+            if manifest:
+                done_bytes = sum(seg.pos - seg.start for seg in segments)
+                progress.update(done_bytes)
+                logger.info(f"断点续传 {filename}：已完成 {done_bytes}/{total_size} 字节")
+            else:
+                # 预分配目标文件，各分段直接写到自己的偏移处
+                _preallocate(fd, total_size)
+                part_size = max(1, math.ceil(total_size / workers))
+                segments = [
+                    _Segment(start, min(start + part_size - 1, total_size - 1))
+                    for start in range(0, total_size, part_size)
+                ]
+                _checkpoint(force=True)
+
+            pending = deque(seg for seg in segments if not seg.done)
+            active: List[_Segment] = []
+            conn_rates: List[float] = []
+            steal_min = max(1, settings.download_steal_min_bytes)
+
+            def _steal() -> Optional[_Segment]:
+                """空闲 worker 把预计最晚完成的分段的后一半拆出来自己下载。"""
+                slowest = max(active, key=lambda seg: (seg.eta(), seg.remaining), default=None)
+                if slowest is None or slowest.remaining < 2 * steal_min:
+                    return None
+                mid = slowest.cursor + slowest.remaining // 2
+                tail = _Segment(mid, slowest.end)
+                slowest.end = mid - 1
+                segments.append(tail)
+                return tail
+
+            async def _worker(index: int) -> None:
+                received, busy = 0, 0.0
+                try:
+                    while True:
+                        src = sources[index % len(sources)]
+                        # 每个分段都重新申请连接槽位，小文件可以在分段之间插队
+                        async with connection_slot(host_of(src.url), priority):
+                            segment = pending.popleft() if pending else _steal()
+                            if segment is None:
+                                return
+                            active.append(segment)
+                            segment.started_at, segment.started_cursor = time.monotonic(), segment.cursor
+                            try:
+                                await __download_chunk_async(
+                                    session=session,
+                                    source=src,
+                                    segment=segment,
+                                    writer=writer,
+                                    progress=progress,
+                                    progress_lock=progress_lock,
+                                    chunk_bytes=chunk_bytes,
+                                    throttle=throttle,
+                                    buffer_bytes=buffer_bytes,
+                                    req_kwargs=req_kwargs,
+                                    expected_total=total_size,
+                                )
+                            except (aiohttp.ClientError, asyncio.TimeoutError, SourceMismatchError) as e:
+                                if isinstance(e, SourceMismatchError):
+                                    drop_mirror(src.mirror, str(e))
+                                if src in sources:
+                                    if len(sources) == 1:
+                                        raise
+                                    sources.remove(src)
+                                    logger.warning(f"下载来源 {host_of(src.url)} 失败，{filename} 改由其余来源下载：{e}")
+                                # 已收到的部分保留，剩余部分放回队列由其他来源继续
+                                pending.appendleft(segment)
+                            finally:
+                                active.remove(segment)
+                                received += segment.cursor - segment.started_cursor
+                                busy += time.monotonic() - segment.started_at
+                                if src.mirror and segment.cursor > segment.started_cursor:
+                                    served_by.add(src.mirror)
+                finally:
+                    if received and busy > 0:
+                        conn_rates.append(received / busy)
+
+            started = time.monotonic()
+            before = sum(seg.pos - seg.start for seg in segments)
+            tasks.extend(asyncio.create_task(_worker(i)) for i in range(workers))
 
-            await asyncio.gather(*tasks)
-            await _merge_parts(fullpath, num_threads)
-            return True
-        finally:
-            progress.close()
+            try:
+                # 任一 worker 最终失败时 gather 立即抛出，finally 中取消其余分段
+                await asyncio.gather(*tasks)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 200:
+                    raise
+                # 声明支持 Range 却返回完整内容：停掉其余分段，改为单流
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await _call_source(source, _single_stream)
+            else:
+                fetched = sum(seg.pos - seg.start for seg in segments) - before
+                host_stats.record(host, workers, fetched, time.monotonic() - started, conn_rates)
+
+        await writer.close()
+        final = {"size": total_size, "validator": validator, "complete": True}
+        if hasher is not None:
+            await asyncio.to_thread(hasher.catch_up, os.fstat(fd).st_size)
+            actual = hasher.hexdigest()
+            if actual != expected_sha:
+                discard = True
+                for template in served_by:
+                    drop_mirror(template, f"参与下载的 {filename} 摘要不一致")
+                raise DigestMismatchError(f"{filename} 摘要不一致：期望 {expected_sha}，实际 {actual}")
+            final["sha256"] = actual
+            if hasher.read_back:
+                logger.debug(f"{filename} 校验时回读乱序分段 {hasher.read_back} 字节")
+        completed = True
+        if total_size is not None:
+            _save_manifest(fullpath, final)
+        return True
+    finally:
+        # 失败时先停掉其余分段并等写协程退出，再关闭文件描述符
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await writer.close()
+        except Exception:
+            pass
+        if not completed and not discard:
+            try:
+                # 记录已落盘的进度，下次调用从这里继续
+                _checkpoint(force=True)
+            except OSError:
+                pass
+        os.close(fd)
+        progress.close()
+        if discard:
+            # 内容已损坏，续传也没有意义，下次整个文件重新下载
+            for stale in (fullpath, fullpath + MANIFEST_SUFFIX):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
@@ -0,0 +1,111 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+from lib.conf import settings
+
+
+def size_priority(size: Optional[int]) -> float:
+    """按字节数排队，小的先下；大小未知的排在最后。"""
+    return float("inf") if size is None else float(size)
+
+
+class PriorityLimiter:
+    """
+    并发上限为 limit() 的槽位：空闲时直接放行，满了按 priority 从小到大排队（同优先级先来先得），
+    记录排队深度与等待时间用于 /stats 展示。
+    """
+
+    def __init__(self, name: str, limit: Callable[[], int]):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self.granted = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    def _wake(self) -> None:
+        while self._waiters and self.active < max(1, self.limit()):
+            *_, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self.active += 1
+                fut.set_result(None)
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._wake()
+
+    async def _acquire(self, priority: float) -> None:
+        if self.active < max(1, self.limit()) and not self.waiting:
+            self.active += 1
+            self.granted += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        started = time.monotonic()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # 已经分到槽位却在恢复前被取消：把槽位让给下一个
+            if fut.done() and not fut.cancelled():
+                self._release()
+            else:
+                fut.cancel()
+            raise
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.queued += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    @asynccontextmanager
+    async def acquire(self, priority: float = 0):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def describe(self) -> str:
+        text = f"{self.name} {self.active}/{max(1, self.limit())}，排队 {self.waiting}"
+        if self.queued:
+            text += f"，平均等待 {self.wait_total / self.queued:.1f}s，最长 {self.wait_max:.1f}s"
+        return text
+
+
+# 全进程共用：同时下载的仓库数 -> 同时下载的文件数 -> 全局与单主机的连接数，始终按这个顺序申请
+repo_slots = PriorityLimiter("仓库", lambda: settings.download_max_repos)
+file_slots = PriorityLimiter("文件", lambda: settings.download_max_files)
+connection_slots = PriorityLimiter("连接", lambda: settings.download_max_connections)
+_host_slots: Dict[str, PriorityLimiter] = {}
+
+
+def host_slots(host: str) -> PriorityLimiter:
+    limiter = _host_slots.get(host)
+    if limiter is None:
+        limiter = _host_slots[host] = PriorityLimiter(host, lambda: settings.download_max_connections_per_host)
+    return limiter
+
+
+@asynccontextmanager
+async def connection_slot(host: str, priority: float):
+    """一个到 host 的下载连接：先占单主机槽位，再占全局槽位。"""
+    async with host_slots(host).acquire(priority):
+        async with connection_slots.acquire(priority):
+            yield
+
+
+def format_download_queue_stats() -> str:
+    parts = [limiter.describe() for limiter in (repo_slots, file_slots, connection_slots)]
+    busy = [limiter.describe() for limiter in _host_slots.values() if limiter.waiting]
+    return "；".join(parts + busy)
@@ -0,0 +1,120 @@
+import os
+import json
+import math
+from typing import Dict, List, Optional
+
+from lib.conf import settings
+from lib.log import logger
+
+# 指数滑动平均的权重
+_ALPHA = 0.3
+
+
+def _ewma(old: Optional[float], new: float) -> float:
+    return new if old is None else old * (1 - _ALPHA) + new * _ALPHA
+
+
+class HostStats:
+    """
+    按主机记录下载吞吐：单连接速率（EWMA）与不同并发数下的总速率（EWMA），
+    持久化到 state_path/host_stats.json，重启后分段数直接从历史最优附近开始。
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, dict] = {}
+        self._loaded = False
+
+    @property
+    def path(self) -> str:
+        return os.path.join(settings.state_path, "host_stats.json")
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.hosts = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取主机吞吐统计失败，重新统计：{e}")
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(settings.state_path, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.hosts, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"保存主机吞吐统计失败：{e}")
+
+    def record(self, host: str, connections: int, nbytes: int, seconds: float, conn_rates: List[float]) -> None:
+        """记录一次下载：connections 个连接共传输 nbytes 字节，耗时 seconds 秒。"""
+        if not host or seconds <= 0 or nbytes < settings.download_min_segment_bytes:
+            return
+        self._load()
+        entry = self.hosts.setdefault(host, {"conn_rate": None, "by_parallel": {}})
+        if conn_rates:
+            median = sorted(conn_rates)[len(conn_rates) // 2]
+            entry["conn_rate"] = _ewma(entry.get("conn_rate"), median)
+        # 总速率只在每个连接都分到足够数据时才有意义，否则主要是建连延迟
+        if nbytes >= connections * settings.download_min_segment_bytes:
+            key = str(connections)
+            entry["by_parallel"][key] = _ewma(entry["by_parallel"].get(key), nbytes / seconds)
+        self._save()
+
+    def plan(self, host: str, size: int, default: int) -> int:
+        """
+        根据文件大小与主机历史决定分段数：
+        - 单连接 1 秒内就能下完、或不足两个最小分段时只用 1 段；
+        - 有历史时取总速率最高的并发数，若它就是试过的最大值则多试一个；
+        - 没有历史时用 default；结果不超过 download_max_segments 与 size / 最小分段。
+        """
+        min_seg = settings.download_min_segment_bytes
+        by_size = max(1, min(settings.download_max_segments, size // min_seg))
+        if by_size == 1:
+            return 1
+        self._load()
+        entry = self.hosts.get(host) or {}
+        rate = entry.get("conn_rate")
+        if rate and size / rate <= 1:
+            return 1
+        by_parallel = {int(n): r for n, r in (entry.get("by_parallel") or {}).items()}
+        if not by_parallel:
+            return max(1, min(by_size, default))
+        best = max(by_parallel, key=by_parallel.get)
+        if best == max(by_parallel):
+            best += 1
+        return max(1, min(by_size, best))
+
+    def snapshot(self, limit: int = 5) -> List[tuple]:
+        self._load()
+        rows = []
+        for host, entry in self.hosts.items():
+            by_parallel = {int(n): r for n, r in (entry.get("by_parallel") or {}).items()}
+            best = max(by_parallel, key=by_parallel.get) if by_parallel else None
+            rows.append((host, entry.get("conn_rate") or 0.0, best, by_parallel.get(best, 0.0) if best else 0.0))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+
+host_stats = HostStats()
+
+
+def _fmt_rate(rate: float) -> str:
+    if rate <= 0:
+        return "-"
+    unit = int(min(3, math.log(max(rate, 1), 1024)))
+    return f"{rate / 1024 ** unit:.1f}{['B', 'KiB', 'MiB', 'GiB'][unit]}/s"
+
+
+def format_host_stats() -> str:
+    rows = host_stats.snapshot()
+    if not rows:
+        return "暂无"
+    return "；".join(
+        f"{host} 单连接 {_fmt_rate(conn)}，最佳并发 {best or '-'}（{_fmt_rate(total)}）"
+        for host, conn, best, total in rows
+    )
@@ -0,0 +1,100 @@
+import aiohttp
+from typing import Optional
+from lib.conf import settings
+from lib.log import logger
+
+_session: Optional[aiohttp.ClientSession] = None
+_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "dns_cache_hit": 0,
+    "dns_cache_miss": 0,
+}
+
+
+def _build_trace_config() -> aiohttp.TraceConfig:
+    """通过 aiohttp trace 钩子统计连接复用与 DNS 缓存命中情况。"""
+    trace = aiohttp.TraceConfig()
+
+    async def _on_request_start(session, ctx, params):
+        _stats["requests"] += 1
+
+    async def _on_connection_create_end(session, ctx, params):
+        _stats["connections_created"] += 1
+
+    async def _on_connection_reuseconn(session, ctx, params):
+        _stats["connections_reused"] += 1
+
+    async def _on_dns_cache_hit(session, ctx, params):
+        _stats["dns_cache_hit"] += 1
+
+    async def _on_dns_cache_miss(session, ctx, params):
+        _stats["dns_cache_miss"] += 1
+
+    trace.on_request_start.append(_on_request_start)
+    trace.on_connection_create_end.append(_on_connection_create_end)
+    trace.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace.on_dns_cache_miss.append(_on_dns_cache_miss)
+    return trace
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=settings.http_dns_ttl,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        enable_cleanup_closed=True,
+    )
+    # 超时按请求单独指定，这里不设置全局超时
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=None),
+        trace_configs=[_build_trace_config()],
+    )
+
+
+async def start_http_client() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info("🌐 HTTP 连接池已启动")
+    return _session
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """获取进程级共享的 ClientSession，未启动时惰性创建（必须在事件循环内调用）。"""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info("🌐 HTTP 连接池已惰性启动")
+    return _session
+
+
+async def close_http_client() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        logger.info(f"🌐 HTTP 连接池关闭，{format_http_stats()}")
+        await _session.close()
+    _session = None
+
+
+def get_http_stats() -> dict:
+    stats = dict(_stats)
+    connections = stats["connections_created"] + stats["connections_reused"]
+    stats["reuse_rate"] = stats["connections_reused"] / connections if connections else 0.0
+    dns = stats["dns_cache_hit"] + stats["dns_cache_miss"]
+    stats["dns_hit_rate"] = stats["dns_cache_hit"] / dns if dns else 0.0
+    return stats
+
+
+def format_http_stats() -> str:
+    stats = get_http_stats()
+    return (
+        f"请求 {stats['requests']} 次，新建连接 {stats['connections_created']}，"
+        f"复用连接 {stats['connections_reused']}，复用率 {stats['reuse_rate']:.1%}，"
+        f"DNS 缓存命中率 {stats['dns_hit_rate']:.1%}"
+    )
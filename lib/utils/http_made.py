@@ -88,6 +88,17 @@ def get_header(key) -> dict:
         }
     return headers
     
+def get_api_header(key) -> dict:
+    """GitHub API 请求头：允许 gzip 压缩 JSON 响应（aiohttp 会自动解压）。"""
+    agent = random.choice(__headers_list)
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "Accept-Encoding": "gzip, deflate",
+        "Authorization": "token " + key,
+        "user-agent": agent['user-agent']
+        }
+    return headers
+
 def get_header_without_token() -> dict:
     agent = random.choice(__headers_list)
     headers = {
@@ -0,0 +1,51 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from lib.conf import settings
+from lib.log import logger
+from lib.utils.signed_url import needs_resolve
+
+# 镜像模板 -> 隔离到期时间（内容与上游不一致的镜像一段时间内不再使用）
+_quarantine: Dict[str, float] = {}
+
+
+class SourceMismatchError(Exception):
+    """下载来源返回的内容与预期不一致（例如 Content-Range 中的总大小不同）。"""
+
+
+def _templates() -> List[str]:
+    return [t.strip() for t in settings.download_mirrors.split(",") if t.strip()]
+
+
+def render(template: str, url: str) -> str:
+    """模板支持 {url} / {host} / {path}；不含占位符时视为前缀，直接拼接原地址（ghproxy 风格）。"""
+    if "{" not in template:
+        return template + url
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    return template.format(url=url, host=parts.hostname or "", path=path)
+
+
+def mirror_urls(url: str) -> List[Tuple[str, str]]:
+    """GitHub release 下载地址对应的可用镜像 [(模板, 镜像地址)]，跳过隔离中的模板。"""
+    if not needs_resolve(url):
+        return []
+    now = time.time()
+    return [(t, render(t, url)) for t in _templates() if _quarantine.get(t, 0) <= now]
+
+
+def drop_mirror(template: Optional[str], reason: str) -> None:
+    if not template:
+        return
+    _quarantine[template] = time.time() + settings.mirror_quarantine_seconds
+    logger.warning(f"镜像 {template} {reason}，隔离 {settings.mirror_quarantine_seconds} 秒")
+
+
+def format_mirror_stats() -> str:
+    templates = _templates()
+    if not templates:
+        return "未配置"
+    now = time.time()
+    dropped = [t for t in templates if _quarantine.get(t, 0) > now]
+    return f"{len(templates)} 个，隔离中 {len(dropped)} 个" + (f"（{', '.join(dropped)}）" if dropped else "")
@@ -0,0 +1,189 @@
+import time
+import random
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from lib.conf import settings
+from lib.log import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """目标主机熔断中，直接失败而不发请求。"""
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器：连续失败 breaker_failure_threshold 次后打开，
+    breaker_open_seconds 后进入半开状态只放行一个探测请求，探测成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            level = logger.info if state == CLOSED else logger.warning
+            level(f"熔断器 {self.host}: {self.state} -> {state}（连续失败 {self.failures} 次）")
+            self.state = state
+
+    def is_open(self) -> bool:
+        """熔断中且尚未到探测时间（不占用半开探测名额）。"""
+        return self.state == OPEN and time.monotonic() - self.opened_at < settings.breaker_open_seconds
+
+    def allow(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= settings.breaker_open_seconds:
+            self._transition(HALF_OPEN)
+            self.probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.failures >= settings.breaker_failure_threshold:
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release_probe(self) -> None:
+        """探测请求被取消或因与主机健康无关的异常结束：不计成功也不计失败，只归还探测名额。"""
+        self.probing = False
+
+    def record_exception(self, exc: BaseException) -> None:
+        if isinstance(exc, aiohttp.ClientResponseError) and not is_host_failure(exc.status):
+            # 404 等说明主机是健康的
+            self.record_success()
+        else:
+            self.record_failure()
+
+
+class RetryBudget:
+    """
+    全局重试预算（令牌桶）：每个请求存入 retry_budget_ratio 个令牌，每次重试消耗 1 个，
+    上限 retry_budget_max。上游整体故障时重试会很快被预算拦下，不会成倍放大请求量。
+    """
+
+    def __init__(self):
+        self.tokens = float(settings.retry_budget_max)
+        self.retries = 0
+        self.denied = 0
+
+    def on_request(self) -> None:
+        self.tokens = min(float(settings.retry_budget_max), self.tokens + settings.retry_budget_ratio)
+
+    def try_retry(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+
+T = TypeVar("T")
+
+_breakers: Dict[str, CircuitBreaker] = {}
+retry_budget = RetryBudget()
+
+
+def host_of(url) -> str:
+    return (getattr(url, "host", None) or urlsplit(str(url)).hostname or "").lower()
+
+
+def get_breaker(url) -> CircuitBreaker:
+    host = host_of(url)
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = CircuitBreaker(host)
+        _breakers[host] = breaker
+    return breaker
+
+
+def check_breaker(url) -> CircuitBreaker:
+    """发请求前调用：熔断中直接抛 CircuitOpenError，否则计入重试预算并返回熔断器。"""
+    breaker = get_breaker(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.host} 熔断中，跳过请求")
+    retry_budget.on_request()
+    return breaker
+
+
+def is_host_failure(status: int) -> bool:
+    """5xx / 429 视为主机不健康；其余 4xx 是请求本身的问题，不计入熔断。"""
+    return status >= 500 or status == 429
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return is_host_failure(exc.status)
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def backoff_delay(attempt: int) -> float:
+    """指数退避 + 完全抖动（full jitter），避免大量请求同时重试。"""
+    ceiling = min(settings.retry_backoff_cap, settings.retry_backoff_base * (2 ** max(0, attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+async def call_with_retry(url, func: Callable[[], Awaitable[T]], attempts: Optional[int] = None) -> T:
+    """
+    API 与下载共用的请求包装：每次尝试前检查目标主机熔断器，结果计入熔断统计；
+    只对超时、网络错误、5xx/429 重试，且每次重试都要从全局预算中取令牌，按抖动退避等待。
+    """
+    attempts = attempts or settings.retry_max_attempts
+    attempt = 0
+    while True:
+        breaker = check_breaker(url)
+        try:
+            result = await func()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            breaker.record_exception(e)
+            attempt += 1
+            if not is_retryable(e) or attempt >= attempts or not retry_budget.try_retry():
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        except BaseException:
+            # 取消、解析错误、内容校验失败等：半开状态下必须归还探测名额，否则该主机会一直被拒绝
+            breaker.release_probe()
+            raise
+        breaker.record_success()
+        return result
+
+
+def breaker_snapshot() -> List[dict]:
+    return [
+        {"host": b.host, "state": b.state, "failures": b.failures, "rejected": b.rejected}
+        for b in _breakers.values()
+    ]
+
+
+def format_resilience_stats() -> str:
+    opened = [f"{b['host']}({b['state']})" for b in breaker_snapshot() if b["state"] != CLOSED]
+    return (
+        f"熔断主机 {', '.join(opened) or '无'}，"
+        f"重试预算剩余 {retry_budget.tokens:.1f}，已重试 {retry_budget.retries} 次，拒绝重试 {retry_budget.denied} 次"
+    )
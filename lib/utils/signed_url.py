@@ -0,0 +1,151 @@
+import json
+import time
+import base64
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+import aiohttp
+
+from lib.conf import settings
+from lib.log import logger
+from lib.utils.resilience import call_with_retry
+
+_REDIRECT_STATUS = (301, 302, 303, 307, 308)
+# 下载地址 -> (签名直链, 过期时间戳)
+_cache: Dict[str, Tuple[str, float]] = {}
+# 正在解析的下载地址 -> (锁, 等待者数)，解析结束且没人等待时删除，不随历史地址增长
+_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+_stats = {"hits": 0, "resolved": 0, "invalidated": 0}
+
+
+def needs_resolve(url: str) -> bool:
+    """只有 GitHub release 下载地址会跳转到短期签名直链，其余地址直接使用。"""
+    parts = urlsplit(url)
+    return (parts.hostname or "").lower() == "github.com" and "/releases/download/" in parts.path
+
+
+def _jwt_exp(token: str) -> Optional[float]:
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _expires_at(url: str) -> float:
+    """从签名参数中解析过期时间（jwt exp / Azure se / S3 X-Amz-* / Expires），解析不到时按默认 TTL。"""
+    query = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    try:
+        exp = _jwt_exp(query["jwt"]) if "jwt" in query else None
+        if exp:
+            return exp
+        if "se" in query:
+            return datetime.fromisoformat(query["se"].replace("Z", "+00:00")).timestamp()
+        if "X-Amz-Date" in query and "X-Amz-Expires" in query:
+            signed = datetime.strptime(query["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            return signed.timestamp() + int(query["X-Amz-Expires"])
+        if "Expires" in query:
+            return float(query["Expires"])
+    except ValueError:
+        pass
+    return time.time() + settings.signed_url_default_ttl
+
+
+def _cached(url: str) -> Optional[str]:
+    entry = _cache.get(url)
+    if entry and entry[1] - settings.signed_url_margin_seconds > time.time():
+        return entry[0]
+    _cache.pop(url, None)
+    return None
+
+
+def _store(url: str, signed: str) -> None:
+    """缓存签名直链，顺带清掉所有已过期的条目（长期运行时缓存只保留仍可用的直链）。"""
+    deadline = time.time() + settings.signed_url_margin_seconds
+    for key in [k for k, (_, expires) in _cache.items() if expires <= deadline]:
+        del _cache[key]
+    _cache[url] = (signed, _expires_at(signed))
+
+
+class ResolvedURL:
+    """
+    一个下载地址及其当前使用的签名直链：跳转只解析一次并缓存到临近过期，
+    所有分段与重试直接请求存储主机；直链返回 403/410 时作废缓存重新解析。
+    """
+
+    def __init__(
+        self,
+        origin: str,
+        session: aiohttp.ClientSession,
+        headers: dict,
+        req_kwargs: dict,
+        mirror: Optional[str] = None,
+    ):
+        self.origin = origin
+        self.url = origin
+        # 来自镜像时记录镜像模板，内容不一致时据此隔离
+        self.mirror = mirror
+        self._session = session
+        self._headers = headers
+        self._req_kwargs = req_kwargs
+
+    async def resolve(self) -> str:
+        if not needs_resolve(self.origin):
+            return self.url
+        lock, users = _locks.get(self.origin) or (asyncio.Lock(), 0)
+        _locks[self.origin] = (lock, users + 1)
+        try:
+            async with lock:
+                cached = _cached(self.origin)
+                if cached:
+                    _stats["hits"] += 1
+                else:
+                    cached = await call_with_retry(self.origin, self._follow)
+                    if cached != self.origin:
+                        _store(self.origin, cached)
+                        _stats["resolved"] += 1
+                self.url = cached
+        finally:
+            lock, users = _locks[self.origin]
+            if users > 1:
+                _locks[self.origin] = (lock, users - 1)
+            else:
+                del _locks[self.origin]
+        return self.url
+
+    async def _follow(self) -> str:
+        """只跟随 GitHub 自身的跳转，到达存储主机即停止，不向存储主机发 HEAD。"""
+        url = self.origin
+        for _ in range(5):
+            async with self._session.head(url, headers=self._headers, allow_redirects=False, **self._req_kwargs) as resp:
+                if resp.status not in _REDIRECT_STATUS:
+                    resp.raise_for_status()
+                    return url
+                url = urljoin(url, resp.headers.get("Location", ""))
+            if not needs_resolve(url):
+                return url
+        return url
+
+    async def refresh(self, failed_url: str, status: int) -> bool:
+        """签名直链 failed_url 被拒（过期或失效）时作废缓存并重新解析；未经跳转的地址返回 False。"""
+        if failed_url == self.origin:
+            return False
+        if self.url == failed_url:
+            entry = _cache.get(self.origin)
+            if entry and entry[0] == failed_url:
+                _cache.pop(self.origin, None)
+                _stats["invalidated"] += 1
+                logger.info(f"签名链接返回 {status}，重新解析 {self.origin}")
+            await self.resolve()
+        # 并发分段同时失败时只重新解析一次，其余分段直接使用新直链
+        return True
+
+
+def format_signed_url_stats() -> str:
+    return (
+        f"缓存 {len(_cache)} 条，命中 {_stats['hits']} 次，"
+        f"解析 {_stats['resolved']} 次，失效重解析 {_stats['invalidated']} 次"
+    )
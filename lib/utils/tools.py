@@ -2,6 +2,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import os
 from lib.log import logger
+from lib.conf import settings
 
 BJ = ZoneInfo("Asia/Shanghai")
 
@@ -18,6 +19,7 @@ def to_bj_aware(dt):
 def get_download_field(filter: str="github") -> str:
     mapping = {
         "github": "browser_download_url",
+        "http": "url",
     }
     return mapping.get(filter.lower(), "browser_download_url")
 
@@ -45,4 +47,27 @@ def count_files(path: str) -> int:
         return 0
     except Exception as e:
         logger.error(f'发生错误！！！{e}')
-        return 0
\ No newline at end of file
+        return 0
+
+
+def store_dir(*parts: str) -> str:
+    '''程序内部数据（去重 blob、版本目录、预取等）的存放位置：默认是下载根目录旁边的 <download_root_path>.gda-store，不在 openlist 对外展示的目录里'''
+    root = settings.store_path or os.path.normpath(settings.download_root_path) + ".gda-store"
+    return os.path.join(root, *parts)
+
+
+def move_legacy_dir(old: str, new: str) -> bool:
+    '''
+    旧版本把内部目录（.gda-blobs、.gda-versions、.gda-staging）放在下载根目录里，会被 openlist 一并展示出来；
+    启动时把它们整体移到 store_dir 下（同一文件系统下只是一次 rename），新位置已存在时不动
+    '''
+    if not os.path.isdir(old) or os.path.lexists(new):
+        return False
+    try:
+        os.makedirs(os.path.dirname(new), exist_ok=True)
+        os.rename(old, new)
+    except OSError as e:
+        logger.warning(f'迁移 {old} 到 {new} 失败：{e}')
+        return False
+    logger.info(f'已将 {old} 迁移到 {new}')
+    return True
@@ -0,0 +1,3 @@
+from .server import create_webhook_app, start_webhook_server, stop_webhook_server
+
+__all__ = ["create_webhook_app", "start_webhook_server", "stop_webhook_server"]
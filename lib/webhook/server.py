@@ -0,0 +1,92 @@
+import hmac
+import hashlib
+import json
+from typing import Optional
+
+from aiohttp import web
+
+from lib.conf import settings
+from lib.log import logger
+from lib.db import run_db_session, get_all_list_items
+from lib.core.github.remote import apply_release_payload
+
+_runner: Optional[web.AppRunner] = None
+
+# published 覆盖新发布，released 覆盖预发布转正
+_RELEASE_ACTIONS = {"published", "released"}
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+async def _match_repository(full_name: str) -> Optional[str]:
+    """GitHub 返回的 full_name 大小写可能与配置不同，按不区分大小写匹配 ListItem。"""
+    items = await run_db_session(get_all_list_items)
+    for item in items:
+        if item.repository.strip("/").lower() == full_name.lower():
+            return item.repository
+    return None
+
+
+async def _handle_github(request: web.Request) -> web.Response:
+    body = await request.read()
+    if not verify_signature(settings.webhook_secret, body, request.headers.get("X-Hub-Signature-256")):
+        logger.warning(f"Webhook 签名校验失败，来源 {request.remote}")
+        return web.json_response({"result": "bad_signature"}, status=401)
+
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return web.json_response({"result": "pong"})
+    if event != "release":
+        return web.json_response({"result": "ignored"}, status=202)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return web.json_response({"result": "bad_payload"}, status=400)
+
+    release = payload.get("release") or {}
+    full_name = (payload.get("repository") or {}).get("full_name", "")
+    if payload.get("action") not in _RELEASE_ACTIONS or release.get("draft") or release.get("prerelease"):
+        return web.json_response({"result": "ignored"}, status=202)
+
+    repo = await _match_repository(full_name)
+    if repo is None:
+        return web.json_response({"result": "unknown_repository"}, status=404)
+
+    result = await apply_release_payload(repo, release)
+    logger.info(f"📨 收到 {repo} release webhook（{release.get('tag_name')}）：{result}")
+    return web.json_response({"result": result})
+
+
+def create_webhook_app() -> web.Application:
+    app = web.Application(client_max_size=settings.webhook_max_body_bytes)
+    app.router.add_post(settings.webhook_path, _handle_github)
+    return app
+
+
+async def start_webhook_server() -> Optional[web.AppRunner]:
+    global _runner
+    if not settings.webhook_enabled:
+        return None
+    if not settings.webhook_secret:
+        logger.error("已启用 webhook 但未配置 webhook_secret，拒绝启动 webhook 服务")
+        return None
+
+    _runner = web.AppRunner(create_webhook_app(), access_log=None)
+    await _runner.setup()
+    site = web.TCPSite(_runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info(f"📨 Webhook 服务已启动：{settings.webhook_host}:{settings.webhook_port}{settings.webhook_path}")
+    return _runner
+
+
+async def stop_webhook_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
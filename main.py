@@ -2,9 +2,11 @@ import asyncio
 import signal
 
 from lib.init import boot
-from lib.schedule import scheduler
+from lib.schedule import scheduler, run_due_poller, cancel_all_downloads
 from lib.log import logger
 from lib.telegram import start_telegram_bot  
+from lib.utils import start_http_client, close_http_client
+from lib.webhook import start_webhook_server, stop_webhook_server
 
 
 async def run_bg(coro, name: str):
@@ -19,11 +21,18 @@ async def main():
     # 1) 应用启动（数据库、配置等）
     await boot()
 
-    # 2) 启动 APScheduler
+    # 2) 启动进程级 HTTP 连接池（GitHub 轮询与文件下载共用）
+    await start_http_client()
+
+    # 3) 启动 APScheduler
     scheduler.start()
     logger.info("✅ Scheduler started")
+    asyncio.create_task(run_bg(run_due_poller(), "due_poller"))
+
+    # 4) 启动 release webhook 接收服务（可选）
+    await start_webhook_server()
 
-    # 3) 启动 Telegram 机器人（后台运行）
+    # 5) 启动 Telegram 机器人（后台运行）
     telegram_started = False
     if not telegram_started:
         asyncio.create_task(run_bg(start_telegram_bot(), "telegram_bot"))
@@ -45,6 +54,24 @@ async def main():
     except Exception:
         logger.exception("Scheduler shutdown failed")
 
+    try:
+        await stop_webhook_server()
+    except Exception:
+        logger.exception("Webhook server shutdown failed")
+
+    try:
+        # 先停掉进行中的下载并保存断点，再关闭连接池
+        moved = await cancel_all_downloads("进程退出")
+        if moved:
+            logger.info(f"已取消进行中的下载，本次共传输 {moved} 字节，重启后从断点继续")
+    except Exception:
+        logger.exception("Download cancellation failed")
+
+    try:
+        await close_http_client()
+    except Exception:
+        logger.exception("HTTP client shutdown failed")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,101 @@
+import os
+import sys
+import asyncio
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings 在导入时读取环境变量，必须在导入 lib 之前准备好
+_tmp = tempfile.mkdtemp(prefix="gda-tests-")
+os.environ.update(
+    SESSION_PATH=os.path.join(_tmp, "sessions"),
+    DOWNLOAD_ROOT_PATH=os.path.join(_tmp, "downloads") + "/",
+    STATE_PATH=os.path.join(_tmp, "state") + "/",
+    LOG_PATH=os.path.join(_tmp, "logs"),
+    YAML_FILE=os.path.join(_tmp, "config.yaml"),
+    DB_URL=f"sqlite+aiosqlite:///{_tmp}/db.sqlite",
+    GITHUB_TOKEN="test-token",
+    TELEGRAM_BOT_TOKEN="x",
+    ADMIN_TELEGRAM_ID="1",
+    TELEGRAM_API_ID="1",
+    TELEGRAM_API_HASH="x",
+    WEBHOOK_SECRET="s3cret",
+)
+
+# 与 main.py 相同的导入顺序，避免 lib.utils 与 lib.log 的循环导入
+import lib.conf  # noqa: E402
+import lib.init  # noqa: E402
+import lib.schedule  # noqa: E402
+from aiohttp import web  # noqa: E402
+from lib.conf import settings  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """在新的事件循环里执行协程，结束时关闭连接池与数据库连接。"""
+    from lib.db.db import bot_engine
+    from lib.utils import start_http_client, close_http_client
+
+    def _run(coro):
+        async def _main():
+            await start_http_client()
+            try:
+                return await coro
+            finally:
+                await close_http_client()
+                await bot_engine.dispose()
+
+        return asyncio.run(_main())
+
+    return _run
+
+
+@pytest.fixture
+def roots(tmp_path, monkeypatch):
+    """每个用例独立的下载根目录与内部数据目录。"""
+    download_root = tmp_path / "downloads"
+    download_root.mkdir()
+    monkeypatch.setattr(settings, "download_root_path", str(download_root) + "/")
+    monkeypatch.setattr(settings, "store_path", str(tmp_path / "store"))
+    monkeypatch.setattr(settings, "state_path", str(tmp_path / "state") + "/")
+    return download_root
+
+
+@pytest.fixture
+def db(run):
+    from lib.db import init_db
+    from lib.db.base import ManagedBase
+    from lib.db.db import bot_engine
+
+    async def _reset():
+        async with bot_engine.begin() as conn:
+            await conn.run_sync(ManagedBase.metadata.drop_all)
+        await init_db()
+
+    run(_reset())
+
+
+def file_app(files: dict) -> web.Application:
+    """按 /files/<name> 提供 files 中的内容，支持 HEAD 与单段 Range。"""
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        data = files[request.match_info["name"]]
+        headers = {"Accept-Ranges": "bytes", "Content-Length": str(len(data))}
+        if request.method == "HEAD":
+            return web.Response(headers=headers)
+        rng = request.headers.get("Range")
+        if rng:
+            start, end = rng.split("=", 1)[1].split("-")
+            start, end = int(start), min(int(end or len(data) - 1), len(data) - 1)
+            return web.Response(
+                status=206,
+                body=data[start:end + 1],
+                headers={"Content-Range": f"bytes {start}-{end}/{len(data)}"},
+            )
+        return web.Response(body=data)
+
+    app = web.Application()
+    app.router.add_route("*", "/files/{name}", handler)
+    return app
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+import pytest
+
+from lib.conf import settings
+from lib.schedule.cadence import compute_poll_interval
+from lib.utils import get_bj_now
+
+DAY = 86400
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(settings, "poll_jitter_ratio", 0.0)
+
+
+def _history(gap_days: float, count: int = 3):
+    last = get_bj_now()
+    return [(last - timedelta(days=gap_days * i)).isoformat() for i in reversed(range(count))], last
+
+
+def test_hot_window_for_long_gap_does_not_poll_at_min_interval():
+    history, last = _history(182)
+    interval = compute_poll_interval(history, now=last + timedelta(days=170))
+    assert interval == settings.poll_max_interval_seconds
+
+
+def test_hot_window_polls_are_bounded_per_window():
+    history, last = _history(182)
+    now, polls = last + timedelta(days=182 * 0.9), 0
+    while now < last + timedelta(days=182 * 2):
+        now += timedelta(seconds=compute_poll_interval(history, now=now))
+        polls += 1
+    # 至多每天一次，远少于整个窗口按最小间隔检查（约 2.9 万次）
+    assert polls <= 182 * 1.1 + 1
+
+
+def test_hot_window_still_dense_for_frequent_releases():
+    history, last = _history(1)
+    interval = compute_poll_interval(history, now=last + timedelta(hours=23))
+    assert interval == max(settings.poll_min_interval_seconds, DAY * 0.01)
+    assert interval < compute_poll_interval(history, now=last + timedelta(hours=1))
@@ -0,0 +1,29 @@
+import pytest
+
+from lib.conf import settings
+from lib.init.init import init_config
+
+OWNERS = """
+owners:
+  - owner: "Org"
+    config:
+      folder: "Org"
+    enable: True
+"""
+
+
+@pytest.mark.parametrize("repositories", ["", "repositories:\n"])
+def test_owners_only_config(repositories, tmp_path, db, run, monkeypatch):
+    from lib.db import run_db_session, get_all_list_items, get_owner_item
+
+    config = tmp_path / "config.yaml"
+    config.write_text(repositories + OWNERS, encoding="utf-8")
+    monkeypatch.setattr(settings, "yaml_file", str(config))
+
+    async def scenario():
+        await init_config()
+        return await run_db_session(get_all_list_items), await run_db_session(get_owner_item, "Org")
+
+    items, owner = run(scenario())
+    assert items == []
+    assert owner.folder == "Org" and owner.enabled
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from lib.conf import settings
+from lib.utils import download
+from lib.utils.download_queue import connection_slots
+from lib.utils.http_client import get_http_session
+from lib.utils.signed_url import ResolvedURL
+
+SIZE = 1000
+
+
+def test_race_picks_faster_mirror_and_closes_loser(run, monkeypatch):
+    monkeypatch.setattr(settings, "mirror_probe_bytes", 100)
+    monkeypatch.setattr(settings, "mirror_race_timeout", 30)
+    seen = {"slots": []}
+
+    async def fast(request: web.Request) -> web.Response:
+        seen["slots"].append(connection_slots.active)
+        return web.Response(status=206, body=b"x" * 100, headers={"Content-Range": f"bytes 0-99/{SIZE}"})
+
+    async def slow(request: web.Request) -> web.StreamResponse:
+        resp = web.StreamResponse(status=206, headers={"Content-Range": f"bytes 0-99/{SIZE}", "Content-Length": "100"})
+        await resp.prepare(request)
+        try:
+            # 一直慢慢写，直到客户端断开连接
+            for _ in range(100):
+                await resp.write(b"x")
+                await asyncio.sleep(0.05)
+        except (ConnectionError, asyncio.CancelledError):
+            seen["closed"].set()
+            raise
+        return resp
+
+    async def scenario():
+        seen["closed"] = asyncio.Event()
+        slow_app, fast_app = web.Application(), web.Application()
+        slow_app.router.add_get("/a.bin", slow)
+        fast_app.router.add_get("/a.bin", fast)
+        async with TestServer(slow_app) as slow_server, TestServer(fast_app) as fast_server:
+            session = get_http_session()
+            sources = [
+                ResolvedURL(str(server.make_url("/a.bin")), session, {}, {})
+                for server in (slow_server, fast_server)
+            ]
+            started = time.monotonic()
+            ranked = await download._race_sources(session, sources, SIZE, {}, priority=SIZE)
+            elapsed = time.monotonic() - started
+            await asyncio.wait_for(seen["closed"].wait(), 5)
+            return [s.origin for s in ranked], [s.origin for s in sources], elapsed
+
+    ranked, sources, elapsed = run(scenario())
+    assert ranked == [sources[1], sources[0]]
+    assert elapsed < 2
+    # 两个探测都占着连接槽位，竞速结束后全部释放
+    assert seen["slots"] == [2]
+    assert connection_slots.active == 0
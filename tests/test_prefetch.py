@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from lib.conf import settings
+from lib.core.github import prefetch
+from lib.utils.download_queue import file_slots
+
+ITEM = SimpleNamespace(repository="o/r", path="R", options={"prerelease": True})
+LINKS = [{"name": "a.bin", "url": "https://example.com/a.bin", "size": 3, "digest": None}]
+
+
+def test_take_staged_waits_for_running_prefetch_of_same_tag(roots, run, monkeypatch):
+    monkeypatch.setattr(prefetch, "_prefetch_tasks", {})
+    target = prefetch.staging_dir(ITEM, "v2")
+
+    async def scenario():
+        async def finishing_prefetch():
+            await asyncio.sleep(0.05)
+            (part / "a.bin").write_bytes(b"abc")
+            part.rename(target)
+
+        part = roots.parent / "store" / "staging" / "R" / ("v2" + prefetch._PART_SUFFIX)
+        part.mkdir(parents=True)
+        prefetch._prefetch_tasks[ITEM.repository] = asyncio.create_task(finishing_prefetch())
+        return await prefetch.take_staged(ITEM, "v2", LINKS)
+
+    assert run(scenario()) == (target, {"a.bin"})
+
+
+def test_take_staged_cancels_prefetch_of_other_tag(roots, run, monkeypatch):
+    monkeypatch.setattr(prefetch, "_prefetch_tasks", {})
+
+    async def scenario():
+        task = asyncio.create_task(asyncio.sleep(3600))
+        prefetch._prefetch_tasks[ITEM.repository] = task
+        result = await prefetch.take_staged(ITEM, "v2", LINKS)
+        return result, task.cancelled()
+
+    assert run(scenario()) == (None, True)
+
+
+def test_stage_uses_shared_file_slots(roots, run, monkeypatch):
+    monkeypatch.setattr(settings, "download_max_files", 1)
+    active = []
+
+    async def fake_download(url, filename, path, **kwargs):
+        active.append(file_slots.active)
+        with open(f"{path}/{filename}", "wb") as f:
+            f.write(b"abc")
+
+    monkeypatch.setattr(prefetch, "download_file_async", fake_download)
+    links = LINKS + [{"name": "b.bin", "url": "https://example.com/b.bin", "size": 3, "digest": None}]
+    run(prefetch._stage(ITEM, {"version": "v2", "assets": links, "links": links}))
+
+    assert active == [1, 1]
+    assert file_slots.active == 0
+    assert sorted(p.name for p in (roots.parent / "store" / "staging" / "R" / "v2").iterdir()) == ["a.bin", "b.bin"]
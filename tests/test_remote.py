@@ -0,0 +1,28 @@
+import asyncio
+
+from lib.core.github import remote
+
+
+def test_cancel_outside_file_downloads_rolls_back_to_pending(roots, db, run, monkeypatch):
+    from lib.db import run_db_session, create_list_item, refresh_item, ListItem
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hanging_reuse(*args, **kwargs):
+            started.set()
+            await asyncio.sleep(3600)
+
+        monkeypatch.setattr(remote, "reuse_unchanged", hanging_reuse)
+        await run_db_session(create_list_item, ListItem(
+            name="X", repository="o/x", path="X", status="PENDING", new_version="v1",
+            links=[{"name": "a.bin", "url": "http://127.0.0.1:9/a.bin", "size": 1, "digest": None}],
+        ))
+        task = asyncio.create_task(remote._download_repo_links(await run_db_session(refresh_item, "o/x")))
+        await started.wait()
+        assert (await run_db_session(refresh_item, "o/x")).status == "DOWNLOADING"
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await run_db_session(refresh_item, "o/x")
+
+    assert run(scenario()).status == "PENDING"
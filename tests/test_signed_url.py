@@ -0,0 +1,44 @@
+import time
+import asyncio
+
+from lib.utils import signed_url
+from lib.utils.signed_url import ResolvedURL
+
+ORIGIN = "https://github.com/o/r/releases/download/v1/{}.bin"
+
+
+def _signed(name: str, expires: float) -> str:
+    return f"https://objects.example.com/{name}?Expires={int(expires)}"
+
+
+def test_expired_entries_and_idle_locks_are_dropped(run, monkeypatch):
+    monkeypatch.setattr(signed_url, "_cache", {})
+    monkeypatch.setattr(signed_url, "_locks", {})
+    follows = []
+
+    async def follow(self):
+        follows.append(self.origin)
+        await asyncio.sleep(0.01)
+        return _signed(self.origin.rsplit("/", 1)[1], time.time() + 3600)
+
+    monkeypatch.setattr(ResolvedURL, "_follow", follow)
+    signed_url._cache[ORIGIN.format("old")] = (_signed("old", time.time() - 10), time.time() - 10)
+
+    async def scenario():
+        urls = [ResolvedURL(ORIGIN.format(n), None, {}, {}) for n in ("a", "a", "b")]
+        await asyncio.gather(*(u.resolve() for u in urls))
+        return urls
+
+    urls = run(scenario())
+
+    # 同一地址并发解析只跟随一次跳转
+    assert sorted(follows) == [ORIGIN.format("a"), ORIGIN.format("b")]
+    assert urls[0].url == urls[1].url != urls[0].origin
+    assert set(signed_url._cache) == {ORIGIN.format("a"), ORIGIN.format("b")}
+    assert signed_url._locks == {}
+
+
+def test_lookup_drops_expired_entry(monkeypatch):
+    monkeypatch.setattr(signed_url, "_cache", {ORIGIN.format("x"): ("https://s/x", time.time() - 1)})
+    assert signed_url._cached(ORIGIN.format("x")) is None
+    assert signed_url._cache == {}
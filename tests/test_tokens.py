@@ -0,0 +1,53 @@
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from lib.core.github import tokens
+from lib.core.github.tokens import TokenPool, request_with_pool
+
+
+def _limited_app(limited: set, seen: list) -> web.Application:
+
+    async def handler(request: web.Request) -> web.Response:
+        token = request.headers["Authorization"].split()[-1]
+        seen.append(token)
+        if token in limited:
+            return web.Response(status=403, headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            })
+        return web.json_response({"token": token}, headers={"X-RateLimit-Remaining": "10"})
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    return app
+
+
+def test_request_with_pool_switches_token_when_rate_limited(run, monkeypatch):
+    monkeypatch.setattr(tokens, "token_pool", TokenPool(["A", "B"]))
+
+    async def scenario():
+        seen = []
+        server = TestServer(_limited_app({"A"}, seen))
+        await server.start_server()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with request_with_pool(session, "GET", str(server.make_url("/api"))) as resp:
+                    return await resp.json(), seen
+        finally:
+            await server.close()
+
+    body, seen = run(scenario())
+    assert body == {"token": "B"}
+    assert seen == ["A", "B"]
+
+
+def test_exhausted_token_without_reset_time_recovers():
+    pool = TokenPool(["A"])
+    pool.update("A", {"X-RateLimit-Remaining": "0"})
+    state = pool._state("A", "core")
+    assert state.budget(time.time()) == 0
+    assert 0 < state.reset_at - time.time() <= tokens.UNKNOWN_RESET_SECONDS
+    assert state.budget(state.reset_at) == float("inf")
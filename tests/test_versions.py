@@ -0,0 +1,62 @@
+import os
+import errno
+
+from aiohttp.test_utils import TestServer
+
+from conftest import file_app
+from lib.core.github import remote
+from lib.core.github.versions import publish_version, versions_root
+
+
+def _fail_rename(monkeypatch, src_to_fail: str, err: int) -> None:
+    real_rename = os.rename
+
+    def fake(src, dst, *args, **kwargs):
+        if os.path.normpath(src) == os.path.normpath(src_to_fail):
+            raise OSError(err, os.strerror(err))
+        return real_rename(src, dst, *args, **kwargs)
+
+    monkeypatch.setattr(os, "rename", fake)
+
+
+def test_publish_version_copies_when_store_is_on_another_filesystem(roots, monkeypatch):
+    tmp_dir = roots / "G" / "X.tmp-v1"
+    tmp_dir.mkdir(parents=True)
+    (tmp_dir / "a.bin").write_bytes(b"payload")
+    _fail_rename(monkeypatch, str(tmp_dir), errno.EXDEV)
+
+    target = publish_version("G/X", str(tmp_dir), "v1")
+
+    assert target == os.path.join(versions_root("G/X"), "v1")
+    assert os.path.realpath(roots / "G" / "X") == os.path.realpath(target)
+    assert (roots / "G" / "X" / "a.bin").read_bytes() == b"payload"
+    assert not tmp_dir.exists()
+    assert sorted(os.listdir(versions_root("G/X"))) == ["v1"]
+
+
+def test_publish_failure_rolls_back_to_pending(roots, db, run, monkeypatch):
+    from lib.db import run_db_session, create_list_item, refresh_item, ListItem
+    from lib.core.github.release import normalize_rest_asset
+
+    def broken_publish(path, tmp_dir, tag):
+        raise OSError(errno.EIO, "disk error")
+
+    monkeypatch.setattr(remote, "publish_version", broken_publish)
+
+    async def scenario():
+        server = TestServer(file_app({"a.bin": b"x" * 2048}))
+        await server.start_server()
+        try:
+            asset = {"name": "a.bin", "browser_download_url": str(server.make_url("/files/a.bin")), "size": 2048}
+            await run_db_session(create_list_item, ListItem(
+                name="X", repository="o/x", path="X", status="PENDING",
+                new_version="v1", links=[normalize_rest_asset(asset)],
+            ))
+            ok = await remote._download_repo_links(await run_db_session(refresh_item, "o/x"))
+            return ok, await run_db_session(refresh_item, "o/x")
+        finally:
+            await server.close()
+
+    ok, item = run(scenario())
+    assert ok is False
+    assert item.status == "PENDING"
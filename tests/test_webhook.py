@@ -0,0 +1,86 @@
+import hmac
+import json
+import hashlib
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from lib.conf import settings
+from lib.core.github import remote
+from lib.webhook.server import create_webhook_app
+
+
+def _sign(body: bytes, secret: str = "s3cret") -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _release(repo: str = "o/r", tag: str = "v2", action: str = "published") -> bytes:
+    return json.dumps({
+        "action": action,
+        "release": {"tag_name": tag, "draft": False, "prerelease": False},
+        "repository": {"full_name": repo},
+    }).encode()
+
+
+@pytest.fixture
+def hooked(roots, db, run, monkeypatch):
+    """监听 o/r（当前 v1），记录 webhook 触发的远程检查与下载提交。"""
+    from lib.db import run_db_session, create_list_item, ListItem
+
+    calls = {"remote": [], "submitted": []}
+
+    async def fake_remote_info(repo, **kwargs):
+        calls["remote"].append(repo)
+        return {"version": "v2", "links": [{"name": "a.bin", "url": "http://127.0.0.1:9/a.bin", "size": 1}]}
+
+    monkeypatch.setattr(remote, "get_remote_info", fake_remote_info)
+    monkeypatch.setattr(remote, "submit_download", lambda repo: calls["submitted"].append(repo) or True)
+    run(run_db_session(create_list_item, ListItem(name="r", repository="o/r", path="r", version="v1")))
+    return calls
+
+
+def _post(run, body: bytes, headers: dict):
+    async def scenario():
+        async with TestClient(TestServer(create_webhook_app())) as client:
+            resp = await client.post(settings.webhook_path, data=body, headers=headers)
+            return resp.status, await resp.json()
+
+    return run(scenario())
+
+
+def test_valid_signature_polls_repository(hooked, run):
+    from lib.db import run_db_session, refresh_item
+
+    body = _release()
+    status, data = _post(run, body, {"X-GitHub-Event": "release", "X-Hub-Signature-256": _sign(body)})
+    assert (status, data["result"]) == (200, "updated")
+    assert hooked == {"remote": ["o/r"], "submitted": ["o/r"]}
+    item = run(run_db_session(refresh_item, "o/r"))
+    assert (item.status, item.new_version) == ("PENDING", "v2")
+
+
+@pytest.mark.parametrize("signature", [None, "sha256=" + "0" * 64, _sign(_release(), secret="wrong")])
+def test_bad_or_missing_signature_is_rejected(hooked, run, signature):
+    headers = {"X-GitHub-Event": "release"}
+    if signature:
+        headers["X-Hub-Signature-256"] = signature
+    status, data = _post(run, _release(), headers)
+    assert (status, data["result"]) == (401, "bad_signature")
+    assert hooked == {"remote": [], "submitted": []}
+
+
+def test_unwatched_repository_is_not_polled(hooked, run):
+    body = _release(repo="other/repo")
+    status, data = _post(run, body, {"X-GitHub-Event": "release", "X-Hub-Signature-256": _sign(body)})
+    assert (status, data["result"]) == (404, "unknown_repository")
+    assert hooked == {"remote": [], "submitted": []}
+
+
+@pytest.mark.parametrize("event, body", [
+    ("push", json.dumps({"repository": {"full_name": "o/r"}}).encode()),
+    ("release", _release(action="edited")),
+])
+def test_non_release_event_is_ignored(hooked, run, event, body):
+    status, data = _post(run, body, {"X-GitHub-Event": event, "X-Hub-Signature-256": _sign(body)})
+    assert (status, data["result"]) == (202, "ignored")
+    assert hooked == {"remote": [], "submitted": []}